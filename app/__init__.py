@@ -3,10 +3,10 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
-def create_app():
+def create_app(database_uri="sqlite:///university.db"):
     app = Flask(__name__)
     app.config["SECRET_KEY"] = "super-secret-key"
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///university.db"
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
     db.init_app(app)
@@ -15,9 +15,30 @@ def create_app():
     from .routes import main
     app.register_blueprint(main)
 
+    # Session event listeners for the audit log, chart rollups and scholarship matches
+    from . import audit, rollups, scholarships  # noqa: F401
+
+    from .commands import register_commands
+    register_commands(app)
+
+    # Photo URLs in templates and long-lived caching of the resized files
+    from . import photos
+    photos.init_app(app)
+
+    # Background ANALYZE / incremental vacuum when enough has changed
+    from . import maintenance
+    maintenance.init_app(app)
+
     # Create database tables
     with app.app_context():
         db.create_all()
 
+        from .migrations import upgrade_schema
+        upgrade_schema()
+
+        # Warm the roll-number filter once per worker
+        from .roll_index import roll_index
+        roll_index.warm_up()
+
     return app
 
@@ -0,0 +1,122 @@
+import heapq
+from collections import namedtuple
+
+from . import db
+from .models import Programme
+from .references import normalize
+
+
+# =====================================================
+# ADMISSION SEAT-MATRIX ALLOCATOR
+# =====================================================
+# Seat categories, in the order Programme stores them
+CATEGORIES = ["GEN", "SC", "ST", "OBC", "EWS", "SUPER"]
+
+# What an applicant can belong to; SUPER seats go by the supernumerary flag
+APPLICANT_CATEGORIES = ["GEN", "SC", "ST", "OBC", "EWS"]
+
+CATEGORY_ALIASES = {
+    "GENERAL": "GEN", "OPEN": "GEN", "UR": "GEN", "OC": "GEN",
+}
+
+Applicant = namedtuple("Applicant", "rank applicant_id name category supernumerary preferences")
+Allocation = namedtuple("Allocation", "applicant programme_id seat_category preference_no")
+
+
+def normalize_category(value):
+    """Applicant category; blank means GEN, anything unrecognised gives None."""
+    value = (value or "").strip().upper() or "GEN"
+    value = CATEGORY_ALIASES.get(value, value)
+    return value if value in APPLICANT_CATEGORIES else None
+
+
+def load_seat_matrix():
+    """{programme_id: {category: seats}} for every programme, in one query."""
+    rows = db.session.query(
+        Programme.id, Programme.seats_general, Programme.seats_sc, Programme.seats_st,
+        Programme.seats_obc, Programme.seats_ews, Programme.seats_supernumerary,
+    )
+    return {pid: dict(zip(CATEGORIES, (s or 0 for s in seats))) for pid, *seats in rows}
+
+
+def allocate_seats(applicants, seat_matrix):
+    """
+    Fill every programme's category seats from a ranked applicant list.
+
+    Applicants are taken in merit order (lowest rank first, drawn from one
+    heap per category). Each is offered their preferences in turn: an open
+    (GEN) seat on merit first, then a seat in their own category, then a
+    supernumerary seat if they are eligible for one. Whoever misses out on
+    a preference goes on that programme's waitlist for their category.
+
+    Returns (allocations, waitlists) where waitlists maps
+    (programme_id, category) → applicants ordered by rank.
+    """
+    remaining = {pid: dict(seats) for pid, seats in seat_matrix.items()}
+
+    heaps = {c: [] for c in APPLICANT_CATEGORIES}
+    for seq, a in enumerate(applicants):
+        heaps[a.category].append((a.rank, seq, a))
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    # Merge the category heaps: the head with the best rank goes next
+    heads = [(heap[0], c) for c, heap in heaps.items() if heap]
+    heapq.heapify(heads)
+
+    allocations, waitlists = [], {}
+    while heads:
+        (_, _, a), category = heapq.heappop(heads)
+        heap = heaps[category]
+        heapq.heappop(heap)
+        if heap:
+            heapq.heappush(heads, (heap[0], category))
+
+        for pref_no, pid in enumerate(a.preferences, start=1):
+            seats = remaining.get(pid)
+            if seats is None:
+                continue
+
+            seat = None
+            if seats["GEN"] > 0:
+                seat = "GEN"
+            elif a.category != "GEN" and seats[a.category] > 0:
+                seat = a.category
+            elif a.supernumerary and seats["SUPER"] > 0:
+                seat = "SUPER"
+
+            if seat:
+                seats[seat] -= 1
+                allocations.append(Allocation(a, pid, seat, pref_no))
+                break
+            waitlists.setdefault((pid, a.category), []).append(a)
+
+    return allocations, waitlists
+
+
+def allocation_summary(seat_matrix, allocations):
+    """{programme_id: {category: (filled, seats)}}"""
+    filled = {}
+    for alloc in allocations:
+        per = filled.setdefault(alloc.programme_id, {})
+        per[alloc.seat_category] = per.get(alloc.seat_category, 0) + 1
+
+    return {
+        pid: {c: (filled.get(pid, {}).get(c, 0), seats[c]) for c in CATEGORIES}
+        for pid, seats in seat_matrix.items()
+    }
+
+
+def programme_lookup():
+    """Key → programme id for matching applicant preferences (id or unique name)."""
+    lookup, seen = {}, {}
+    for pid, name in db.session.query(Programme.id, Programme.programme):
+        lookup[str(pid)] = pid
+        key = normalize(name)
+        seen[key] = seen.get(key, 0) + 1
+        lookup[key] = pid
+    # Names shared by several programmes must be given as ids
+    for key, n in seen.items():
+        if n > 1:
+            lookup.pop(key, None)
+    return lookup
@@ -0,0 +1,172 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from . import db
+from .models import Enrollment, ExamResult, Programme, Staff
+
+
+# =====================================================
+# ANALYTICS — pivots over the category × gender count tables
+# =====================================================
+# Enrollment, ExamResult and Staff store one count column per category and
+# gender (general_male, sc_female, ...). Each dataset is read with a single
+# query, melted into a long frame (dimensions, category, gender, count) and
+# every pivot / percentage / delta is computed on that frame.
+CATEGORY_LABELS = {"general": "GEN", "ews": "EWS", "sc": "SC", "st": "ST", "obc": "OBC"}
+GENDERS = ["male", "female", "transgender"]
+
+Dataset = namedtuple("Dataset", "model dimensions count_columns joins")
+
+
+def _count_columns(model):
+    """{column name: (category, gender)} for the model's count columns."""
+    columns = {}
+    for prefix, label in CATEGORY_LABELS.items():
+        for gender in GENDERS:
+            name = f"{prefix}_{gender}"
+            if name in model.__table__.c:
+                columns[name] = (label, gender)
+    if "trans_gender" in model.__table__.c:
+        # Enrollment records transgender students without a category
+        columns["trans_gender"] = ("UNSPECIFIED", "transgender")
+    return columns
+
+
+def _programme_label(model):
+    return db.func.coalesce(Programme.programme, model.programme)
+
+
+DATASETS = {
+    "enrollment": Dataset(
+        Enrollment,
+        {"year": Enrollment.year, "programme": _programme_label(Enrollment), "mode": Enrollment.mode},
+        _count_columns(Enrollment),
+        [(Programme, Enrollment.programme_id == Programme.id)],
+    ),
+    "exam": Dataset(
+        ExamResult,
+        # Rows generated from marks carry their session; for typed-in rows the
+        # year they were entered stands in
+        {"year": db.func.coalesce(ExamResult.session_year,
+                                  db.cast(db.func.strftime("%Y", ExamResult.created_at), db.Integer)),
+         "programme": _programme_label(ExamResult)},
+        _count_columns(ExamResult),
+        [(Programme, ExamResult.programme_id == Programme.id)],
+    ),
+    "staff": Dataset(
+        Staff,
+        {"staff_type": Staff.staff_type, "group": Staff.group},
+        _count_columns(Staff),
+        [],
+    ),
+}
+
+PIVOT_FIELDS = ("category", "gender")
+PERCENT_MODES = ("row", "col", "total")
+YOY_MODES = ("delta", "pct")
+
+
+def load_frame(name):
+    """Long frame for dataset `name`: one row per (record, category, gender)."""
+    dataset = DATASETS[name]
+    dims = list(dataset.dimensions)
+    count_cols = list(dataset.count_columns)
+
+    query = db.session.query(
+        *(expr.label(dim) for dim, expr in dataset.dimensions.items()),
+        *(getattr(dataset.model, col) for col in count_cols),
+    ).select_from(dataset.model)
+    for target, on in dataset.joins:
+        query = query.outerjoin(target, on)
+
+    wide = pd.DataFrame(query.all(), columns=dims + count_cols)
+    wide[count_cols] = wide[count_cols].fillna(0).astype(np.int64)
+
+    long = wide.melt(id_vars=dims, value_vars=count_cols, var_name="column", value_name="count")
+    long["category"] = long["column"].map({c: cat for c, (cat, _) in dataset.count_columns.items()})
+    long["gender"] = long["column"].map({c: g for c, (_, g) in dataset.count_columns.items()})
+    for dim in dims:
+        # Missing labels stay visible in pivots: "Unknown", or year 0
+        numeric = pd.api.types.is_numeric_dtype(long[dim])
+        long[dim] = long[dim].fillna(0).astype(np.int64) if numeric else long[dim].fillna("Unknown")
+    return long.drop(columns="column")
+
+
+def fields(name):
+    return list(DATASETS[name].dimensions) + list(PIVOT_FIELDS)
+
+
+def pivot(name, rows, cols=(), percent=None, yoy=None):
+    """
+    Sum of counts with `rows` down the side and `cols` across the top.
+
+    percent: "row" / "col" / "total" turns counts into shares (0–100).
+    yoy: "delta" / "pct" replaces counts with the change from the previous
+    year; "year" must be one of `rows`.
+    """
+    if name not in DATASETS:
+        raise ValueError(f"Unknown dataset '{name}'. Choose from: {', '.join(DATASETS)}.")
+    allowed = fields(name)
+    rows, cols = list(rows), list(cols)
+    if not rows:
+        raise ValueError("At least one row field is required.")
+    unknown = [f for f in rows + cols if f not in allowed]
+    if unknown or len(set(rows + cols)) != len(rows + cols):
+        raise ValueError(f"Fields must be distinct and among: {', '.join(allowed)}.")
+    if percent not in (None, *PERCENT_MODES):
+        raise ValueError(f"percent must be one of: {', '.join(PERCENT_MODES)}.")
+    if yoy not in (None, *YOY_MODES):
+        raise ValueError(f"yoy must be one of: {', '.join(YOY_MODES)}.")
+    if yoy and "year" not in rows:
+        raise ValueError("yoy needs 'year' among the row fields.")
+
+    frame = load_frame(name)
+    table = frame.pivot_table(
+        index=rows, columns=cols or None, values="count",
+        aggfunc="sum", fill_value=0, observed=True,
+    ).sort_index()
+    if not cols:
+        table = table.rename(columns={"count": "total"})
+
+    if yoy:
+        # Year goes last so the change is taken within each group of the other row fields
+        others = [r for r in rows if r != "year"]
+        table = table.reorder_levels(others + ["year"]).sort_index() if others else table
+        grouped = table.groupby(level=others) if others else table
+        table = grouped.diff() if yoy == "delta" else grouped.pct_change() * 100
+
+    if percent == "row":
+        table = table.div(table.sum(axis=1), axis=0) * 100
+    elif percent == "col":
+        table = table.div(table.sum(axis=0), axis=1) * 100
+    elif percent == "total":
+        table = table / np.nansum(table.to_numpy(dtype=float, na_value=np.nan)) * 100
+
+    return table.replace([np.inf, -np.inf], np.nan).round(2)
+
+
+# -------------------------
+# Output
+# -------------------------
+def _label(key):
+    return " / ".join(str(k) for k in key) if isinstance(key, tuple) else str(key)
+
+
+def to_chart(table):
+    """ApexCharts shape: {"categories": [row labels], "series": [{name, data}]}"""
+    values = table.to_numpy(dtype=float, na_value=np.nan)
+    return {
+        "categories": [_label(k) for k in table.index],
+        "series": [
+            {"name": _label(col), "data": [None if np.isnan(v) else v for v in values[:, i].tolist()]}
+            for i, col in enumerate(table.columns)
+        ],
+    }
+
+
+def to_csv(table):
+    flat = table.copy()
+    flat.columns = [_label(c) for c in flat.columns]
+    return flat.to_csv()
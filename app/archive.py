@@ -0,0 +1,215 @@
+import os
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+
+from flask import current_app
+from sqlalchemy import DateTime, MetaData, select, text
+from sqlalchemy.schema import CreateTable
+
+from . import audit, db
+from .models import NSSEnrollment, Placement
+
+
+# =====================================================
+# ACADEMIC-YEAR ARCHIVES
+# =====================================================
+# Finished academic years are moved out of the main database into one file
+# per year (instance/archive/archive_2023.db holds 2023-24). The hot
+# database only keeps recent years; archives are ATTACHed on a separate
+# connection only when a query's date range reaches back into them.
+#
+# Only tables whose every reader goes through archived_rows() are archived.
+# Enrollment and ExamResult are still read from the live database by the
+# lists, PDFs, analytics, KPIs and profiles, so they stay there for now.
+SESSION_START_MONTH = 7   # sessions run July → June
+
+# Model → column that decides which academic year a row belongs to
+ARCHIVED_MODELS = {
+    NSSEnrollment: "date",
+    Placement: "date",
+}
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def academic_year(day):
+    """Start year of the session `day` falls in (2024-03-10 → 2023)."""
+    return day.year if day.month >= SESSION_START_MONTH else day.year - 1
+
+
+def year_label(start_year):
+    return f"{start_year}-{str(start_year + 1)[-2:]}"
+
+
+def year_bounds(start_year):
+    """[first day, first day of next session)"""
+    return date(start_year, SESSION_START_MONTH, 1), date(start_year + 1, SESSION_START_MONTH, 1)
+
+
+def parse_academic_year(value):
+    """'2023', '2023-24' or '2023-2024' → 2023, or None."""
+    head = str(value or "").strip()[:4]
+    return int(head) if head.isdigit() else None
+
+
+def archive_dir():
+    return os.path.join(current_app.instance_path, "archive")
+
+
+def archive_path(start_year):
+    return os.path.join(archive_dir(), f"archive_{start_year}.db")
+
+
+def archived_years():
+    if not os.path.isdir(archive_dir()):
+        return []
+    years = []
+    for name in os.listdir(archive_dir()):
+        if name.startswith("archive_") and name.endswith(".db") and name[8:-3].isdigit():
+            years.append(int(name[8:-3]))
+    return sorted(years)
+
+
+def _schema(start_year):
+    return f"archive_{start_year}"
+
+
+def _attach(conn, start_year):
+    conn.exec_driver_sql(f"ATTACH DATABASE ? AS {_schema(start_year)}", (archive_path(start_year),))
+    conn.commit()  # end the autobegun (empty) transaction so begin() can start a real one
+
+
+def _detach(conn, start_year):
+    conn.exec_driver_sql(f"DETACH DATABASE {_schema(start_year)}")
+
+
+def _create_archive_tables(conn, schema):
+    for model, column in ARCHIVED_MODELS.items():
+        table = model.__table__
+        ddl = str(CreateTable(table).compile(conn))
+        conn.exec_driver_sql(ddl.replace(
+            f"CREATE TABLE {table.name} ", f"CREATE TABLE IF NOT EXISTS {schema}.{table.name} ", 1))
+        conn.exec_driver_sql(
+            f'CREATE INDEX IF NOT EXISTS {schema}.ix_{table.name}_{column} ON {table.name} ("{column}")')
+
+
+# -------------------------
+# Moving a year out
+# -------------------------
+def archive_year(start_year, dry_run=False):
+    """
+    Move every archived table's rows for session `start_year` into its
+    archive file in one transaction (INSERT … SELECT, then DELETE).
+    Returns {table: rows moved}.
+    """
+    if start_year >= academic_year(date.today()):
+        raise ArchiveError(f"{year_label(start_year)} has not finished yet.")
+
+    first, after = year_bounds(start_year)
+    os.makedirs(archive_dir(), exist_ok=True)
+
+    existed = os.path.exists(archive_path(start_year))
+    try:
+        moved = _move(start_year, first, after, dry_run)
+    except Exception:
+        if not existed and os.path.exists(archive_path(start_year)):
+            os.remove(archive_path(start_year))
+        raise
+
+    if dry_run and not existed:
+        os.remove(archive_path(start_year))
+    return moved
+
+
+def _move(start_year, first, after, dry_run):
+    schema = _schema(start_year)
+    moved = {}
+    with db.engine.connect() as conn:
+        # ATTACH is not allowed inside a transaction, so it comes first
+        _attach(conn, start_year)
+        try:
+            with conn.begin() as trans:
+                _create_archive_tables(conn, schema)
+                ts = datetime.utcnow().isoformat(" ")
+                for model, column in ARCHIVED_MODELS.items():
+                    table = model.__table__.name
+                    where = f'"{column}" >= :first AND "{column}" < :after'
+                    params = {"first": first.isoformat(), "after": after.isoformat()}
+                    columns = ", ".join(f'"{c.name}"' for c in model.__table__.c)
+
+                    moved[table] = conn.execute(
+                        text(f"SELECT COUNT(*) FROM main.{table} WHERE {where}"), params).scalar()
+                    if dry_run or not moved[table]:
+                        continue
+
+                    conn.execute(text(
+                        f"INSERT INTO {schema}.{table} ({columns}) "
+                        f"SELECT {columns} FROM main.{table} WHERE {where}"), params)
+                    if audit.AUDIT_ENABLED:
+                        conn.execute(text(
+                            "INSERT INTO main.audit_log (ts, table_name, row_id, action, changes) "
+                            f"SELECT :ts, :table, id, 'archive', :changes FROM main.{table} WHERE {where}"),
+                            dict(params, ts=ts, table=table,
+                                 changes=f'{{"archive":"{year_label(start_year)}"}}'))
+                    conn.execute(text(f"DELETE FROM main.{table} WHERE {where}"), params)
+
+                if dry_run:
+                    trans.rollback()
+        finally:
+            _detach(conn, start_year)
+    return moved
+
+
+# -------------------------
+# Reading archived rows
+# -------------------------
+_row_types = {}
+
+
+def _row_type(model):
+    # Archived rows carry the session label, so templates can tell them apart
+    if model not in _row_types:
+        base = namedtuple(f"Archived{model.__name__}", [c.name for c in model.__table__.c] + ["archive"])
+        # Column-only properties (NSSEnrollment.total) work on the tuple as well
+        extra = {"total": model.total} if isinstance(vars(model).get("total"), property) else {}
+        _row_types[model] = type(base.__name__, (base,), dict(extra, __slots__=()))
+    return _row_types[model]
+
+
+def archived_rows(model, start=None, end=None):
+    """
+    Rows of `model` from every archive whose session overlaps [start, end].
+    Nothing is attached unless `start` reaches back into an archived year.
+    """
+    if start is None:
+        return []
+    years = [y for y in archived_years()
+             if year_bounds(y)[1] > start and (end is None or year_bounds(y)[0] <= end)]
+    if not years:
+        return []
+
+    column_name = ARCHIVED_MODELS[model]
+    row_type = _row_type(model)
+    rows = []
+    with db.engine.connect() as conn:
+        for year in years:
+            _attach(conn, year)
+            try:
+                table = model.__table__.to_metadata(MetaData(), schema=_schema(year))
+                column = table.c[column_name]
+                if isinstance(column.type, DateTime):
+                    query = select(*table.c).where(column >= datetime.combine(start, time.min))
+                    if end is not None:
+                        query = query.where(column < datetime.combine(end + timedelta(days=1), time.min))
+                else:
+                    query = select(*table.c).where(column >= start)
+                    if end is not None:
+                        query = query.where(column <= end)
+                label = year_label(year)
+                rows.extend(row_type(*row, label) for row in conn.execute(query))
+            finally:
+                conn.rollback()
+                _detach(conn, year)
+    return rows
@@ -0,0 +1,118 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.exceptions import HTTPException
+
+
+# =====================================================
+# ASGI ENTRY FOR PDF / EXPORT DOWNLOADS
+# =====================================================
+# Endpoints whose responses are rendered documents or long streams. These
+# run on a small executor and are streamed from the event loop, so a slow
+# client holds an open socket, not a worker thread.
+EXPORT_ENDPOINTS = {
+    "main.student_pdf",
+    "main.enrollment_pdf",
+    "main.staff_pdf",
+    "main.department_pdf",
+    "main.all_departments_pdf",
+    "main.hostel_pdf",
+    "main.placement_pdf",
+    "main.export_exam_pdf",
+    "main.api_changes",
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AsyncExportApp:
+    """
+    ASGI wrapper around the Flask app.
+
+    Export routes run on `render_workers` threads only while the document is
+    being built; everything else goes through the regular WSGI adapter.
+    Serve with e.g. `uvicorn asgi:app`.
+    """
+
+    def __init__(self, flask_app, render_workers=4):
+        self.flask_app = flask_app
+        self.fallback = WsgiToAsgi(flask_app)
+        self.executor = ThreadPoolExecutor(render_workers, thread_name_prefix="export")
+        self.url_adapter = flask_app.url_map.bind("localhost")
+
+    def _is_export(self, scope):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return False
+        try:
+            endpoint, _ = self.url_adapter.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            return False
+        return endpoint in EXPORT_ENDPOINTS
+
+    async def __call__(self, scope, receive, send):
+        if not self._is_export(scope):
+            return await self.fallback(scope, receive, send)
+
+        loop = asyncio.get_running_loop()
+        environ = _build_environ(scope)
+        status, headers, body = await loop.run_in_executor(self.executor, self._run_view, environ)
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        try:
+            iterator = iter(body)
+            while True:
+                # Pulling the next block may touch disk, so keep it off the loop
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+                if chunk is None:
+                    break
+                for i in range(0, len(chunk), CHUNK_SIZE):
+                    await send({"type": "http.response.body",
+                                "body": chunk[i:i + CHUNK_SIZE], "more_body": True})
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    def _run_view(self, environ):
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (k.lower().encode("latin1"), v.encode("latin1")) for k, v in response_headers
+            ]
+
+        body = self.flask_app(environ, start_response)
+        return started["status"], started["headers"], body
+
+
+def _build_environ(scope):
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "SERVER_NAME": scope["server"][0] if scope.get("server") else "localhost",
+        "SERVER_PORT": str(scope["server"][1]) if scope.get("server") else "80",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        if name not in ("CONTENT_LENGTH", "CONTENT_TYPE"):
+            name = "HTTP_" + name
+        value = value.decode("latin1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
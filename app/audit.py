@@ -0,0 +1,252 @@
+import json
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import bindparam, event, inspect
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import AuditLog
+
+
+# =====================================================
+# AUDIT LOG — row changes captured at flush time
+# =====================================================
+# Every ORM insert/update/delete on the app's models is appended to
+# audit_log on the same connection, so it commits (or rolls back) with the
+# change itself. Updates store only the columns that actually changed.
+#
+# Set-based UPDATE/DELETE statements bypass the ORM unit of work; code that
+# issues them calls record() for the rows it touched.
+AUDIT_ENABLED = True
+
+# Bookkeeping tables: their rows are already a log of the job that wrote them
+NOT_AUDITED = {"audit_log", "maintenance_run", "rollover"}
+
+
+def _value(v):
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    return v
+
+
+def _same(old, new):
+    # Form posts assign "3" to integer columns; don't log 3 → "3" as a change
+    return old == new or (old is not None and new is not None and str(old) == str(new))
+
+
+def _pk(state):
+    # Identity keys are only assigned after the flush; read the PK column instead
+    return state.dict.get(state.mapper.primary_key[0].key)
+
+
+# Plain driver-level INSERT: skips statement compilation on the hot path
+INSERT_SQL = (
+    "INSERT INTO audit_log (ts, table_name, row_id, action, changes) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+
+def _row(table, row_id, action, changes, ts):
+    return (ts, table, row_id, action, json.dumps(changes, default=str, separators=(",", ":")))
+
+
+def _collect(session):
+    ts = datetime.utcnow().isoformat(" ")
+    rows = []
+
+    for obj in session.new:
+        state = inspect(obj)
+        table = state.mapper.local_table.name
+        if table in NOT_AUDITED:
+            continue
+        values = {a.key: _value(state.dict.get(a.key)) for a in state.mapper.column_attrs
+                  if state.dict.get(a.key) is not None}
+        rows.append(_row(table, _pk(state), "insert", values, ts))
+
+    for obj in session.dirty:
+        state = inspect(obj)
+        table = state.mapper.local_table.name
+        if table in NOT_AUDITED or not state.has_identity:
+            continue
+        diff = {}
+        columns = state.mapper.column_attrs
+        # committed_state only holds attributes modified since the last flush
+        for key in list(state.committed_state):
+            if key not in columns:
+                continue
+            hist = state.attrs[key].history
+            if not hist.has_changes():
+                continue
+            old = hist.deleted[0] if hist.deleted else None
+            new = hist.added[0] if hist.added else None
+            if not _same(old, new):
+                diff[key] = [_value(old), _value(new)]
+        if diff:
+            rows.append(_row(table, _pk(state), "update", diff, ts))
+
+    for obj in session.deleted:
+        state = inspect(obj)
+        table = state.mapper.local_table.name
+        if table in NOT_AUDITED or not state.has_identity:
+            continue
+        values = {a.key: _value(state.dict.get(a.key)) for a in state.mapper.column_attrs
+                  if state.dict.get(a.key) is not None}
+        rows.append(_row(table, _pk(state), "delete", values, ts))
+
+    return rows
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    if not AUDIT_ENABLED:
+        return
+    rows = _collect(session)
+    if rows:
+        # The flush's own connection: no extra flush, same transaction
+        session.connection().exec_driver_sql(INSERT_SQL, rows)
+
+
+def record(table, row_ids, action, changes):
+    """Log a set-based change applied to `row_ids` (same transaction as the caller)."""
+    if not AUDIT_ENABLED or not row_ids:
+        return
+    ts = datetime.utcnow().isoformat(" ")
+    db.session.connection().exec_driver_sql(
+        INSERT_SQL, [_row(table, rid, action, changes, ts) for rid in row_ids])
+
+
+def record_each(table, action, changes_by_id):
+    """Like record(), with different changes per row: {row_id: changes}."""
+    if not AUDIT_ENABLED or not changes_by_id:
+        return
+    ts = datetime.utcnow().isoformat(" ")
+    db.session.connection().exec_driver_sql(
+        INSERT_SQL, [_row(table, rid, action, changes, ts) for rid, changes in changes_by_id.items()])
+
+
+# -------------------------
+# Querying
+# -------------------------
+def history(start=None, end=None, table=None, row_id=None, limit=1000):
+    query = AuditLog.query
+    if start:
+        query = query.filter(AuditLog.ts >= start)
+    if end:
+        query = query.filter(AuditLog.ts < end)
+    if table:
+        query = query.filter(AuditLog.table_name == table)
+    if row_id is not None:
+        query = query.filter(AuditLog.row_id == row_id)
+    return query.order_by(AuditLog.id.asc()).limit(limit).all()
+
+
+# -------------------------
+# Retention / compaction
+# -------------------------
+def compact(keep_days=365):
+    """
+    Fold every row's history older than `keep_days` into one "snapshot"
+    entry holding the last known value of each column. Rows deleted before
+    the cutoff keep only their "delete" entry, so change-feed consumers that
+    are behind still see the delete. The newest entry's id is reused for the
+    snapshot so sequence numbers stay monotonic.
+
+    Returns (entries_removed, snapshots_written).
+    """
+    cutoff = datetime.utcnow() - timedelta(days=keep_days)
+    old = (
+        db.session.query(AuditLog.id, AuditLog.table_name, AuditLog.row_id,
+                         AuditLog.action, AuditLog.changes)
+        .filter(AuditLog.ts < cutoff)
+        .order_by(AuditLog.table_name, AuditLog.row_id, AuditLog.id)
+        .yield_per(5000)
+    )
+
+    removed, snapshots = [], []
+    group_key, group_ids, state = None, [], {}
+
+    def close_group():
+        if not group_ids:
+            return
+        if state is None:  # row was deleted: keep the delete as a tombstone
+            removed.extend(group_ids[:-1])
+        elif len(group_ids) > 1:
+            removed.extend(group_ids[:-1])
+            snapshots.append({"id": group_ids[-1], "changes": json.dumps(state, default=str)})
+
+    for entry_id, table, row_id, action, changes in old:
+        key = (table, row_id)
+        if key != group_key:
+            close_group()
+            group_key, group_ids, state = key, [], {}
+        group_ids.append(entry_id)
+
+        data = json.loads(changes) if changes else {}
+        if action == "delete":
+            state = None
+        elif action == "update":
+            state = state or {}
+            state.update({col: new for col, (_, new) in data.items()})
+        else:  # insert / snapshot
+            state = dict(data)
+    close_group()
+
+    table = AuditLog.__table__
+    for i in range(0, len(removed), 500):
+        db.session.execute(table.delete().where(table.c.id.in_(removed[i:i + 500])))
+    if snapshots:
+        db.session.execute(
+            table.update()
+            .where(table.c.id == bindparam("snap_id"))
+            .values(action="snapshot", changes=bindparam("snap_changes")),
+            [{"snap_id": s["id"], "snap_changes": s["changes"]} for s in snapshots],
+        )
+    db.session.commit()
+    return len(removed), len(snapshots)
+
+
+# =====================================================
+# CHANGE FEED
+# =====================================================
+# audit_log.id is the sequence: consumers remember the last seq they saw and
+# ask for everything after it.
+FEED_BATCH = 1000
+
+
+def change_head():
+    """Newest sequence number (0 if nothing has been logged)."""
+    return db.session.query(db.func.coalesce(db.func.max(AuditLog.id), 0)).scalar()
+
+
+def change_feed(engine, since, until, limit):
+    """
+    Yield one JSON line per change with since < seq <= until, in order.
+
+    Reads in keyset batches, each on its own short-lived connection, so the
+    generator holds no transaction open between batches and can be resumed
+    from any thread.
+    """
+    table = AuditLog.__table__
+    last, sent = since, 0
+    while sent < limit:
+        with engine.connect() as conn:
+            batch = conn.execute(
+                table.select()
+                .where(table.c.id > last, table.c.id <= until)
+                .order_by(table.c.id)
+                .limit(min(FEED_BATCH, limit - sent))
+            ).all()
+        if not batch:
+            return
+        lines = []
+        for row in batch:
+            lines.append(json.dumps({
+                "seq": row.id,
+                "ts": row.ts.isoformat() if row.ts else None,
+                "table": row.table_name,
+                "row_id": row.row_id,
+                "action": row.action,
+                "changes": json.loads(row.changes) if row.changes else {},
+            }, default=str))
+        yield ("\n".join(lines) + "\n").encode()
+        last, sent = batch[-1].id, sent + len(batch)
@@ -0,0 +1,207 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from . import db
+from .archive import ARCHIVED_MODELS, archive_path, archived_years
+
+
+# =====================================================
+# ONLINE BACKUPS
+# =====================================================
+# Snapshots are taken with SQLite's online backup API a few pages at a time,
+# pausing between steps so the read lock is only held briefly and data entry
+# carries on. They are gzipped into instance/backups/ and rotated. Archived
+# years (archive.py) live only in their own files, so each snapshot also
+# copies every archive file, as <snapshot>.archive_<year>.db.gz next to it.
+STEP_PAGES = 256     # pages copied per step (4 KiB pages → 1 MiB)
+STEP_PAUSE = 0.02    # seconds to sleep between steps
+MAX_RESTARTS = 5     # after this many restarts, finish in a single step
+KEEP = 14            # snapshots kept by rotate()
+
+SNAPSHOT_PREFIX = "university-"
+SNAPSHOT_SUFFIX = ".db.gz"
+ARCHIVE_MARK = ".archive_"
+
+
+class BackupError(Exception):
+    pass
+
+
+class _Restarted(Exception):
+    pass
+
+
+def backup_dir():
+    return os.path.join(current_app.instance_path, "backups")
+
+
+def snapshots():
+    """Snapshot paths, oldest first (names sort by timestamp)."""
+    if not os.path.isdir(backup_dir()):
+        return []
+    names = sorted(n for n in os.listdir(backup_dir())
+                   if n.startswith(SNAPSHOT_PREFIX) and n.endswith(SNAPSHOT_SUFFIX) and ARCHIVE_MARK not in n)
+    return [os.path.join(backup_dir(), n) for n in names]
+
+
+def _archive_copy(path, year):
+    return f"{path[:-len(SNAPSHOT_SUFFIX)]}{ARCHIVE_MARK}{year}{SNAPSHOT_SUFFIX}"
+
+
+def archive_copies(path):
+    """{year: path} of the archive files saved with snapshot `path`."""
+    prefix = os.path.basename(path[:-len(SNAPSHOT_SUFFIX)]) + ARCHIVE_MARK
+    copies = {}
+    for name in os.listdir(os.path.dirname(path) or "."):
+        year = name[len(prefix):-len(SNAPSHOT_SUFFIX)]
+        if name.startswith(prefix) and name.endswith(SNAPSHOT_SUFFIX) and year.isdigit():
+            copies[int(year)] = os.path.join(os.path.dirname(path), name)
+    return dict(sorted(copies.items()))
+
+
+def _copy(source, target_path, step_pages, pause):
+    """
+    Online backup of `source` into `target_path`. Another connection writing
+    to the database restarts the backup from page one; after MAX_RESTARTS
+    the rest is copied in one step instead of chasing the writers forever.
+    """
+    restarts, last = 0, None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last
+        if last is not None and remaining > last:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _Restarted()
+        last = remaining
+        if remaining:
+            time.sleep(pause)
+
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=step_pages, progress=progress)
+        except _Restarted:
+            source.backup(target, pages=-1)
+    finally:
+        target.close()
+    return restarts
+
+
+def _snapshot_file(source_path, path, step_pages, pause):
+    """Online-copy one database file and gzip it to `path`. Returns restarts."""
+    with tempfile.TemporaryDirectory(dir=backup_dir()) as tmp:
+        raw = os.path.join(tmp, "snapshot.db")
+        source = sqlite3.connect(source_path, timeout=30)
+        try:
+            restarts = _copy(source, raw, step_pages, pause)
+        finally:
+            source.close()
+
+        # Compress next to the final name, then rename: a file is never half-written
+        partial = path + ".part"
+        with open(raw, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(partial, path)
+    return restarts
+
+
+def take_snapshot(step_pages=STEP_PAGES, pause=STEP_PAUSE, keep=KEEP):
+    """Write a gzipped snapshot of the live database and every archive. Returns (path, restarts)."""
+    os.makedirs(backup_dir(), exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(backup_dir(), f"{SNAPSHOT_PREFIX}{stamp}{SNAPSHOT_SUFFIX}")
+
+    # Archives first: the snapshot only shows up in snapshots() once the main file exists
+    restarts = 0
+    for year in archived_years():
+        restarts += _snapshot_file(archive_path(year), _archive_copy(path, year), step_pages, pause)
+    restarts += _snapshot_file(db.engine.url.database, path, step_pages, pause)
+
+    rotate(keep)
+    return path, restarts
+
+
+def rotate(keep=KEEP):
+    """Delete all but the newest `keep` snapshots. Returns the deleted paths."""
+    old = snapshots()[:-keep] if keep > 0 else []
+    for path in old:
+        for copy in archive_copies(path).values():
+            os.remove(copy)
+        os.remove(path)
+    return old
+
+
+# -------------------------
+# Restore check
+# -------------------------
+def _decompress(path, raw):
+    try:
+        with gzip.open(path, "rb") as src, open(raw, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    except (OSError, EOFError) as e:
+        raise BackupError(f"{os.path.basename(path)} cannot be decompressed: {e}")
+
+
+def _check(path, restored, tables):
+    """integrity_check plus presence of `tables`; returns {table: row count}."""
+    try:
+        result = restored.execute("PRAGMA integrity_check").fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"{os.path.basename(path)} is not a database: {e}")
+    if result != "ok":
+        raise BackupError(f"Integrity check of {os.path.basename(path)} failed: {result}")
+
+    present = {name for (name,) in restored.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    missing = [t for t in tables if t not in present]
+    if missing:
+        raise BackupError(f"Tables missing from {os.path.basename(path)}: {', '.join(missing)}")
+    return {t: restored.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+
+
+def verify(path=None):
+    """
+    Restore `path` (default: newest snapshot) and its archive copies into
+    scratch files and check them: PRAGMA integrity_check, every model table
+    present, schema version equal to the live database. Returns
+    {table: row count}, archive tables as "archive_<year>.<table>";
+    raises BackupError.
+    """
+    if path is None:
+        existing = snapshots()
+        if not existing:
+            raise BackupError("No snapshots yet.")
+        path = existing[-1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, "restore.db")
+        _decompress(path, raw)
+        restored = sqlite3.connect(raw)
+        try:
+            counts = _check(path, restored, [t.name for t in db.metadata.sorted_tables])
+            version = restored.execute("PRAGMA user_version").fetchone()[0]
+            with db.engine.connect() as conn:
+                live_version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+            if version != live_version:
+                raise BackupError(f"Snapshot schema version {version}, live database {live_version}.")
+        finally:
+            restored.close()
+
+        archive_tables = [model.__tablename__ for model in ARCHIVED_MODELS]
+        for year, copy in archive_copies(path).items():
+            raw = os.path.join(tmp, f"archive_{year}.db")
+            _decompress(copy, raw)
+            restored = sqlite3.connect(raw)
+            try:
+                for table, n in _check(copy, restored, archive_tables).items():
+                    counts[f"archive_{year}.{table}"] = n
+            finally:
+                restored.close()
+    return counts
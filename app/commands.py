@@ -0,0 +1,550 @@
+import csv
+import os
+import time
+from datetime import date
+from types import SimpleNamespace
+
+import click
+
+from . import db
+from .dates import parse_date
+from .models import Student
+from .references import ReferenceIndex
+from .roll_index import roll_index
+from .scholarships import parse_amount
+
+
+# =====================================================
+# CLI COMMANDS  (flask <command>)
+# =====================================================
+STUDENT_CSV_FIELDS = [
+    "roll_no", "name", "email", "phone", "dob", "gender",
+    "address", "department", "programme", "year", "category", "annual_income",
+]
+
+
+@click.command("import-students")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+def import_students(csv_path):
+    """Bulk import students from a CSV file (header row = Student columns)."""
+    with open(csv_path, newline="", encoding="utf-8") as fh:
+        rows = list(csv.DictReader(fh))
+
+    missing = [i for i, r in enumerate(rows, start=2) if not r.get("roll_no") or not r.get("name")]
+    if missing:
+        raise click.ClickException(f"roll_no and name are required (rows {missing[:10]})")
+
+    # Validate the whole batch up front instead of failing on the N-th commit
+    in_batch, existing = roll_index.validate_batch(r["roll_no"] for r in rows)
+    if in_batch or existing:
+        if in_batch:
+            click.echo(f"Duplicate roll numbers in file: {', '.join(in_batch[:20])}", err=True)
+        if existing:
+            click.echo(f"Roll numbers already registered: {', '.join(existing[:20])}", err=True)
+        raise click.ClickException("Import aborted, nothing was saved.")
+
+    references = ReferenceIndex.load()
+    students = []
+    for r in rows:
+        fields = {k: (r.get(k) or "").strip() or None for k in STUDENT_CSV_FIELDS}
+        fields["dob"] = parse_date(fields["dob"])
+        fields["annual_income"] = parse_amount(fields["annual_income"])
+        fields["department_id"], fields["programme_id"] = references.resolve(
+            fields["department"], fields["programme"])
+        students.append(Student(**fields))
+    db.session.add_all(students)
+    db.session.commit()
+
+    for r in rows:
+        roll_index.add(r["roll_no"].strip())
+    click.echo(f"Imported {len(rows)} students.")
+
+
+@click.command("bench-pdf")
+@click.option("-n", "--iterations", default=200, show_default=True)
+def bench_pdf(iterations):
+    """Micro-benchmark per-document PDF setup and render cost."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import TableStyle
+
+    from .pdf import render
+
+    def per_doc(fn):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter() - start) / iterations * 1000
+
+    # What every route used to do before building a single flowable
+    fresh_setup = per_doc(lambda: (
+        getSampleStyleSheet(),
+        TableStyle([("GRID", (0, 0), (-1, -1), 1, colors.grey),
+                    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey)]),
+    ))
+
+    student = SimpleNamespace(
+        roll_no="23048112001", name="Bench Student", email="bench@uok.edu.in",
+        phone="9000000000", dob=date(2003, 1, 1), gender="Male", address="Srinagar",
+        department="Computer Sciences", programme="MCA", year=2,
+    )
+    cached_render = per_doc(lambda: render("student", student).close())
+
+    click.echo(f"style setup saved per document: {fresh_setup:.3f} ms")
+    click.echo(f"student card render (cached):   {cached_render:.3f} ms")
+
+
+@click.command("backfill-foreign-keys")
+@click.option("--dry-run", is_flag=True, help="Report matches without writing.")
+def backfill_foreign_keys_command(dry_run):
+    """Link free-text department/programme columns to Department/Programme ids."""
+    from .migrations import backfill_foreign_keys
+
+    report = backfill_foreign_keys(dry_run=dry_run)
+    for table, result in report.items():
+        click.echo(f"{table}: {result['matched']} rows matched")
+        for value, n in sorted(result["unmatched"].items(), key=lambda kv: -kv[1]):
+            click.echo(f"    unmatched {value!r}: {n} rows")
+    if dry_run:
+        click.echo("Dry run — nothing was written.")
+
+
+@click.command("allocate-hostels")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+def allocate_hostels(csv_path):
+    """
+    Allocate a batch of students to hostels.
+
+    CSV columns: roll_no, then one or more preference columns (pref1, pref2,
+    ...) holding hostel names or ids. Row order is priority order.
+    """
+    from .hostel_allocation import AllocationError, bulk_allocate
+    from .models import Hostel
+
+    with open(csv_path, newline="", encoding="utf-8") as fh:
+        rows = list(csv.DictReader(fh))
+
+    hostel_ids = {}
+    for hid, name in db.session.query(Hostel.id, Hostel.name):
+        hostel_ids[str(hid)] = hid
+        hostel_ids[name.strip().lower()] = hid
+
+    roll_nos = [(r.get("roll_no") or "").strip() for r in rows]
+    student_ids = {}
+    for i in range(0, len(roll_nos), 500):
+        student_ids.update(
+            db.session.query(Student.roll_no, Student.id).filter(Student.roll_no.in_(roll_nos[i:i + 500]))
+        )
+
+    requests, unknown = [], []
+    for roll_no, r in zip(roll_nos, rows):
+        if roll_no not in student_ids:
+            unknown.append(roll_no)
+            continue
+        prefs = [hostel_ids.get((v or "").strip().lower())
+                 for k, v in r.items() if k and k.startswith("pref")]
+        requests.append((student_ids[roll_no], [p for p in prefs if p is not None]))
+
+    try:
+        placed, unplaced = bulk_allocate(requests)
+    except AllocationError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Placed {len(placed)} students, {len(unplaced)} could not be placed.")
+    if unknown:
+        click.echo(f"Unknown roll numbers: {', '.join(unknown[:20])}", err=True)
+
+
+@click.command("recount-hostels")
+def recount_hostels():
+    """Reset hostel occupancy counters from the students linked to each hostel."""
+    from .hostel_allocation import recount_occupancy
+
+    counts = recount_occupancy()
+    click.echo(f"Recounted {sum(counts.values())} residents across {len(counts)} hostels.")
+
+
+@click.command("allocate-admissions")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--out", "out_dir", default="admission_reports", show_default=True,
+              type=click.Path(file_okay=False), help="Directory for the report CSVs.")
+def allocate_admissions(csv_path, out_dir):
+    """
+    Allocate programme seats to a ranked applicant list.
+
+    CSV columns: applicant_id, name, category (GEN/SC/ST/OBC/EWS), rank,
+    optional supernumerary (yes/no) and preference columns pref1, pref2, ...
+    holding programme ids or names. Writes allocation.csv, waitlist.csv
+    and summary.csv to --out.
+    """
+    import os
+
+    from .admissions import (
+        Applicant, CATEGORIES, allocate_seats, allocation_summary,
+        load_seat_matrix, normalize_category, programme_lookup,
+    )
+    from .models import Programme
+    from .references import normalize
+
+    lookup = programme_lookup()
+    applicants, bad_rows, bad_categories = [], [], []
+    with open(csv_path, newline="", encoding="utf-8") as fh:
+        for line_no, r in enumerate(csv.DictReader(fh), start=2):
+            try:
+                rank = float(r["rank"])
+            except (KeyError, TypeError, ValueError):
+                bad_rows.append(line_no)
+                continue
+            category = normalize_category(r.get("category"))
+            if category is None:
+                bad_categories.append(f"{line_no} ({(r.get('category') or '').strip()})")
+                continue
+            prefs = [lookup.get(normalize(v)) for k, v in r.items() if k and k.startswith("pref") and v]
+            applicants.append(Applicant(
+                rank=rank,
+                applicant_id=(r.get("applicant_id") or "").strip(),
+                name=(r.get("name") or "").strip(),
+                category=category,
+                supernumerary=(r.get("supernumerary") or "").strip().lower() in ("1", "y", "yes", "true"),
+                preferences=[p for p in prefs if p is not None],
+            ))
+    if bad_rows:
+        click.echo(f"Skipped rows without a numeric rank: {bad_rows[:20]}", err=True)
+    if bad_categories:
+        click.echo(f"Skipped rows with an unknown category: {', '.join(bad_categories[:20])}", err=True)
+
+    seat_matrix = load_seat_matrix()
+    start = time.perf_counter()
+    allocations, waitlists = allocate_seats(applicants, seat_matrix)
+    elapsed = time.perf_counter() - start
+
+    names = dict(db.session.query(Programme.id, Programme.programme))
+    os.makedirs(out_dir, exist_ok=True)
+
+    with open(os.path.join(out_dir, "allocation.csv"), "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["applicant_id", "name", "category", "rank", "programme_id", "programme",
+                    "seat_category", "preference_no"])
+        for al in sorted(allocations, key=lambda al: (al.programme_id, al.applicant.rank)):
+            a = al.applicant
+            w.writerow([a.applicant_id, a.name, a.category, f"{a.rank:g}", al.programme_id,
+                        names.get(al.programme_id), al.seat_category, al.preference_no])
+
+    with open(os.path.join(out_dir, "waitlist.csv"), "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["programme_id", "programme", "category", "position", "applicant_id", "name", "rank"])
+        for (pid, category), queue in sorted(waitlists.items()):
+            for pos, a in enumerate(queue, start=1):
+                w.writerow([pid, names.get(pid), category, pos, a.applicant_id, a.name, f"{a.rank:g}"])
+
+    with open(os.path.join(out_dir, "summary.csv"), "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["programme_id", "programme"] + [f"{c}_{k}" for c in CATEGORIES for k in ("filled", "seats")])
+        for pid, per in sorted(allocation_summary(seat_matrix, allocations).items()):
+            w.writerow([pid, names.get(pid)] + [n for c in CATEGORIES for n in per[c]])
+
+    click.echo(f"Allocated {len(allocations)} of {len(applicants)} applicants across "
+               f"{len(seat_matrix)} programmes in {elapsed:.2f}s. Reports in {out_dir}/")
+
+
+@click.command("compact-audit")
+@click.option("--keep-days", default=365, show_default=True,
+              help="Full history is kept for this many days.")
+def compact_audit(keep_days):
+    """Fold audit history older than --keep-days into one snapshot per row."""
+    from .audit import compact
+
+    removed, snapshots = compact(keep_days)
+    click.echo(f"Removed {removed} audit entries, wrote {snapshots} snapshots.")
+
+
+@click.command("bench-audit")
+@click.option("-n", "--requests", "count", default=200, show_default=True)
+def bench_audit(count):
+    """Time POST /students/edit with and without the audit log (on a scratch copy)."""
+    import sqlite3
+    import tempfile
+
+    from . import audit, create_app
+
+    # The live database is never written: the edits, their audit entries and
+    # everything the listeners derive from them land in a throwaway copy
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, "bench.db")
+        source, target = sqlite3.connect(db.engine.url.database), sqlite3.connect(copy)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+
+        bench_app = create_app(f"sqlite:///{copy}")
+        with bench_app.app_context():
+            try:
+                student = Student.query.filter_by(roll_no="BENCH-AUDIT").first()
+                if student is None:
+                    student = Student(roll_no="BENCH-AUDIT", name="Bench")
+                    db.session.add(student)
+                    db.session.commit()
+                sid = student.id
+                client = bench_app.test_client(use_cookies=False)  # flashes would pile up in the cookie
+
+                def run():
+                    start = time.perf_counter()
+                    for i in range(count):
+                        client.post(f"/students/edit/{sid}", data={
+                            "roll_no": "BENCH-AUDIT", "name": f"Bench {i}", "year": str(i % 4 + 1),
+                        })
+                    return time.perf_counter() - start
+
+                run()  # warm up
+                timings = {}
+                for enabled in (False, True) * 3:
+                    audit.AUDIT_ENABLED = enabled
+                    timings[enabled] = min(timings.get(enabled, float("inf")), run())
+            finally:
+                audit.AUDIT_ENABLED = True
+                db.session.remove()
+                db.engine.dispose()
+
+    plain, audited = timings[False], timings[True]
+    click.echo(f"{count} student edits: {plain / count * 1000:.2f} ms/request without audit, "
+               f"{audited / count * 1000:.2f} ms/request with audit "
+               f"({(audited / plain - 1) * 100:+.1f}%)")
+
+
+@click.command("rebuild-rollups")
+def rebuild_rollups():
+    """Recompute the chart rollups from the source tables and year archives."""
+    from .rollups import rebuild
+
+    with db.engine.begin() as conn:
+        rebuild(conn)
+    click.echo("Rollups rebuilt.")
+
+
+@click.command("rebuild-eligibility")
+def rebuild_eligibility_command():
+    """Re-evaluate every scholarship against every active student."""
+    from .scholarships import rebuild
+
+    start = time.perf_counter()
+    with db.engine.begin() as conn:
+        rebuild(conn)
+    click.echo(f"Scholarship eligibility rebuilt in {time.perf_counter() - start:.2f}s.")
+
+
+@click.command("archive-year")
+@click.argument("year")
+@click.option("--dry-run", is_flag=True, help="Count the rows without moving them.")
+def archive_year_command(year, dry_run):
+    """Move a finished academic year (e.g. 2022 or 2022-23) into its archive file."""
+    from .archive import ArchiveError, archive_path, archive_year, parse_academic_year, year_label
+
+    start_year = parse_academic_year(year)
+    if start_year is None:
+        raise click.BadParameter("expected a year such as 2022 or 2022-23", param_hint="YEAR")
+    try:
+        moved = archive_year(start_year, dry_run=dry_run)
+    except ArchiveError as e:
+        raise click.ClickException(str(e))
+
+    for table, n in moved.items():
+        click.echo(f"{table}: {n} rows")
+    if dry_run:
+        click.echo("Dry run — nothing was moved.")
+    else:
+        click.echo(f"{year_label(start_year)} archived to {archive_path(start_year)}")
+
+
+@click.command("rollover")
+@click.argument("year")
+@click.option("--dry-run", is_flag=True, help="Report what would change without writing.")
+def rollover_command(year, dry_run):
+    """Promote every student at the end of session YEAR (e.g. 2024 or 2024-25)."""
+    from .archive import parse_academic_year
+    from .rollover import RolloverError, rollover
+
+    session_year = parse_academic_year(year)
+    if session_year is None:
+        raise click.BadParameter("expected a year such as 2024 or 2024-25", param_hint="YEAR")
+    start = time.perf_counter()
+    try:
+        result = rollover(session_year, dry_run=dry_run)
+    except RolloverError as e:
+        raise click.ClickException(str(e))
+
+    for year, n in result["promoted"].items():
+        click.echo(f"year {year} → {year + 1}: {n} students")
+    click.echo(f"graduated: {result['graduated']} ({result['vacated_beds']} hostel beds freed)")
+    click.echo(f"skipped (no year or programme duration): {result['skipped']}")
+    if dry_run:
+        click.echo("Dry run — nothing was written.")
+    else:
+        click.echo(f"{result['session']} rolled over in {time.perf_counter() - start:.2f}s.")
+
+
+@click.command("backup")
+@click.option("--keep", default=14, show_default=True, help="Snapshots to keep.")
+@click.option("--step-pages", default=256, show_default=True, help="Pages copied per step.")
+@click.option("--pause", default=0.02, show_default=True, help="Seconds to sleep between steps.")
+@click.option("--verify/--no-verify", "check", default=True, show_default=True,
+              help="Restore the new snapshot into a scratch file and check it.")
+def backup_command(keep, step_pages, pause, check):
+    """Take a compressed online snapshot of the database (safe while in use)."""
+    from .backup import BackupError, take_snapshot, verify
+
+    start = time.perf_counter()
+    path, restarts = take_snapshot(step_pages=step_pages, pause=pause, keep=keep)
+    click.echo(f"Snapshot {path} ({os.path.getsize(path) / 1024:.0f} KiB) "
+               f"in {time.perf_counter() - start:.2f}s, {restarts} restarts.")
+    if check:
+        try:
+            counts = verify(path)
+        except BackupError as e:
+            raise click.ClickException(f"Verification failed: {e}")
+        click.echo(f"Verified: {sum(counts.values())} rows across {len(counts)} tables.")
+
+
+@click.command("verify-backup")
+@click.argument("snapshot", required=False, type=click.Path(exists=True, dir_okay=False))
+def verify_backup(snapshot):
+    """Restore SNAPSHOT (default: the newest) into a scratch file and check it."""
+    from .backup import BackupError, verify
+
+    try:
+        counts = verify(snapshot)
+    except BackupError as e:
+        raise click.ClickException(str(e))
+    for table, n in counts.items():
+        click.echo(f"{table}: {n} rows")
+    click.echo("Snapshot OK.")
+
+
+@click.command("maintain")
+@click.option("--analyze/--no-analyze", default=None,
+              help="Force or skip ANALYZE (default: only when enough has changed).")
+@click.option("--vacuum-pages", default=2000, show_default=True,
+              help="Most pages released by incremental vacuum.")
+@click.option("--enable-incremental-vacuum", "enable", is_flag=True,
+              help="Switch the file to auto_vacuum=INCREMENTAL first (one full VACUUM).")
+def maintain(analyze, vacuum_pages, enable):
+    """Refresh planner statistics and release free pages (run from cron)."""
+    from .maintenance import enable_incremental_vacuum, run
+
+    if enable:
+        current = enable_incremental_vacuum()
+        click.echo(f"auto_vacuum={current['auto_vacuum']}, {current['page_count']} pages.")
+    entry = run("schedule", analyze=analyze, vacuum_pages=vacuum_pages)
+    click.echo(f"{'ANALYZE + ' if entry.analyzed else ''}optimize in {entry.duration_ms} ms; "
+               f"pages {entry.pages_before} → {entry.pages_after}, "
+               f"free {entry.freelist_before} → {entry.freelist_after}.")
+
+
+@click.command("import-photos")
+@click.argument("folder", type=click.Path(exists=True, file_okay=False))
+def import_photos(folder):
+    """Attach photos named <roll_no>.jpg / .png / .webp in FOLDER to their students."""
+    from .photos import IMPORT_BATCH, PhotoError, submit
+
+    roll_to_id = dict(db.session.query(Student.roll_no, Student.id))
+    start = time.perf_counter()
+    imported, pending, skipped = 0, [], []
+
+    def wait():
+        # At most IMPORT_BATCH uploads are held in memory at a time
+        nonlocal imported
+        for name, future in pending:
+            try:
+                future.result()
+                imported += 1
+            except Exception as e:
+                skipped.append(f"{name} ({e})")
+        pending.clear()
+
+    for name in sorted(os.listdir(folder)):
+        roll_no, ext = os.path.splitext(name)
+        if ext.lower() not in (".jpg", ".jpeg", ".png", ".webp") or roll_no not in roll_to_id:
+            skipped.append(name)
+            continue
+        with open(os.path.join(folder, name), "rb") as f:
+            data = f.read()
+        try:
+            pending.append((name, submit(roll_to_id[roll_no], data)))
+        except PhotoError as e:
+            skipped.append(f"{name} ({e})")
+        if len(pending) >= IMPORT_BATCH:
+            wait()
+    wait()
+
+    click.echo(f"Imported {imported} photos in {time.perf_counter() - start:.1f}s.")
+    if skipped:
+        click.echo(f"Skipped {len(skipped)}: {', '.join(skipped[:20])}", err=True)
+
+
+@click.command("import-marks")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+def import_marks_command(csv_path):
+    """
+    Load a mark sheet and recompute results for the terms it covers.
+
+    CSV columns: roll_no, session (2024-25), semester, course_code, marks
+    (AB = absent), optional credits and max_marks. Rows already loaded are
+    corrected in place; nothing is saved if any row is invalid.
+    """
+    from .results import MarksError, import_marks, read_sheet
+
+    start = time.perf_counter()
+    try:
+        loaded = import_marks(read_sheet(csv_path))
+    except MarksError as e:
+        for line in e.errors:
+            click.echo(line, err=True)
+        raise click.ClickException(f"{e.total} invalid row(s); import aborted, nothing was saved.")
+    click.echo(f"{loaded['inserted']} marks added, {loaded['updated']} corrected, "
+               f"{loaded['unchanged']} unchanged in {time.perf_counter() - start:.1f}s.")
+    for r in loaded["results"]:
+        _echo_term(r)
+
+
+@click.command("compute-results")
+@click.argument("session")
+@click.argument("semester", type=int)
+@click.option("--programme-id", type=int, help="Only this programme (default: all).")
+def compute_results_command(session, semester, programme_id):
+    """Recompute SGPA / CGPA and the generated exam results for one term."""
+    from .archive import parse_academic_year
+    from .results import compute
+
+    session_year = parse_academic_year(session)
+    if session_year is None:
+        raise click.BadParameter("use a session such as 2024-25", param_hint="SESSION")
+    _echo_term(compute(session_year, semester, programme_id))
+
+
+def _echo_term(r):
+    click.echo(f"{r['session']} semester {r['semester']}: {r['passed']} of {r['students']} passed "
+               f"across {r['programmes']} programmes in {r['seconds']}s"
+               + (f"; {r['unclassified']} without category/gender left out of the counts."
+                  if r["unclassified"] else "."))
+
+
+def register_commands(app):
+    app.cli.add_command(import_students)
+    app.cli.add_command(bench_pdf)
+    app.cli.add_command(backfill_foreign_keys_command)
+    app.cli.add_command(allocate_hostels)
+    app.cli.add_command(recount_hostels)
+    app.cli.add_command(allocate_admissions)
+    app.cli.add_command(compact_audit)
+    app.cli.add_command(bench_audit)
+    app.cli.add_command(rebuild_rollups)
+    app.cli.add_command(rebuild_eligibility_command)
+    app.cli.add_command(archive_year_command)
+    app.cli.add_command(rollover_command)
+    app.cli.add_command(backup_command)
+    app.cli.add_command(verify_backup)
+    app.cli.add_command(maintain)
+    app.cli.add_command(import_photos)
+    app.cli.add_command(import_marks_command)
+    app.cli.add_command(compute_results_command)
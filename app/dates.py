@@ -0,0 +1,51 @@
+from datetime import date, datetime
+
+
+# -------------------------
+# DATE PARSING (forms, filters, legacy data)
+# -------------------------
+# Day-first before month-first: that is how dates are written here
+DATE_FORMATS = [
+    "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%Y/%m/%d",
+    "%d %B %Y", "%d %b %Y", "%B %d, %Y", "%b %d, %Y", "%d-%b-%Y",
+    "%m/%d/%Y",
+]
+
+
+def parse_date(value):
+    """Return a `date` for a form/legacy string, or None if empty or unparseable."""
+    if value is None or isinstance(value, date):
+        return value
+    value = " ".join(str(value).split())
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_year(value):
+    """Four-digit year from '2019', '2019-20', '01/07/2019' etc., or None."""
+    if value is None or isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if value[:4].isdigit():
+        return int(value[:4])
+    parsed = parse_date(value)
+    return parsed.year if parsed else None
+
+
+def date_range_args(args):
+    """(from, to) dates from ?from=YYYY-MM-DD&to=YYYY-MM-DD query args."""
+    return parse_date(args.get("from")), parse_date(args.get("to"))
+
+
+def filter_date_range(query, column, start, end):
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column <= end)
+    return query
@@ -0,0 +1,199 @@
+from sqlalchemy import bindparam, event, update
+from sqlalchemy.orm import Session
+
+from . import db
+from .audit import record
+from .models import Hostel, Student
+
+
+# =====================================================
+# HOSTEL ALLOCATION
+# =====================================================
+# Hostel.students_residing is only ever changed here, with conditional
+# UPDATEs, so two workers can never push a hostel past its capacity.
+class AllocationError(Exception):
+    pass
+
+
+# Hostel.type → student genders it accepts (anything else is mixed)
+HOSTEL_GENDERS = {
+    "boys": {"male"},
+    "girls": {"female"},
+}
+
+
+def accepts(hostel_type, gender):
+    allowed = HOSTEL_GENDERS.get((hostel_type or "").strip().lower())
+    return allowed is None or (gender or "").strip().lower() in allowed
+
+
+def _take_beds(hostel_id, n=1):
+    """Atomically reserve `n` beds; False if the hostel does not have room."""
+    result = db.session.execute(
+        update(Hostel)
+        .where(Hostel.id == hostel_id,
+               db.func.coalesce(Hostel.students_residing, 0) + n <= db.func.coalesce(Hostel.capacity, 0))
+        .values(students_residing=db.func.coalesce(Hostel.students_residing, 0) + n)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _release_beds(hostel_id, n=1):
+    db.session.execute(
+        update(Hostel)
+        .where(Hostel.id == hostel_id)
+        .values(students_residing=db.func.max(db.func.coalesce(Hostel.students_residing, 0) - n, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def release_beds(counts):
+    """Give back beds freed by a set-based change: {hostel_id: students who left}."""
+    for hostel_id, n in counts.items():
+        _release_beds(hostel_id, n)
+
+
+@event.listens_for(Session, "before_flush")
+def _release_on_delete(session, flush_context, instances):
+    # A deleted student gives their bed back in the same transaction
+    counts = {}
+    for obj in session.deleted:
+        if isinstance(obj, Student) and obj.hostel_id is not None:
+            counts[obj.hostel_id] = counts.get(obj.hostel_id, 0) + 1
+    release_beds(counts)
+
+
+def allocate(student, hostel):
+    """Give `student` a bed in `hostel`. Commits; raises AllocationError."""
+    if student.hostel_id == hostel.id:
+        raise AllocationError(f"{student.name} already lives in {hostel.name}.")
+    if not accepts(hostel.type, student.gender):
+        raise AllocationError(f"{hostel.name} does not accept {student.gender or 'unspecified'} students.")
+
+    previous = student.hostel_id
+    try:
+        if not _take_beds(hostel.id):
+            raise AllocationError(f"{hostel.name} is full.")
+
+        # Guard against the same student being moved twice concurrently
+        moved = db.session.execute(
+            update(Student)
+            .where(Student.id == student.id,
+                   Student.hostel_id.is_(None) if previous is None else Student.hostel_id == previous)
+            .values(hostel_id=hostel.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not moved:
+            raise AllocationError(f"{student.name}'s allocation changed, try again.")
+        record("student", [student.id], "update", {"hostel_id": [previous, hostel.id]})
+
+        if previous is not None:
+            _release_beds(previous)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire_all()
+
+
+def vacate(student):
+    """Remove `student` from their hostel. Commits."""
+    if student.hostel_id is None:
+        return
+    hostel_id = student.hostel_id
+    moved = db.session.execute(
+        update(Student)
+        .where(Student.id == student.id, Student.hostel_id == hostel_id)
+        .values(hostel_id=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if moved:
+        _release_beds(hostel_id)
+        record("student", [student.id], "update", {"hostel_id": [hostel_id, None]})
+    db.session.commit()
+    db.session.expire_all()
+
+
+def bulk_allocate(requests):
+    """
+    Place a whole batch in one pass.
+
+    `requests` is an ordered list of (student_id, [hostel_id, ...]) — earlier
+    entries get priority, hostel ids are in order of preference. Students who
+    already have a bed are skipped. Returns (placed, unplaced) where placed
+    maps student_id → hostel_id and unplaced lists student ids.
+
+    Free beds are computed once, the batch is matched in memory, then every
+    hostel's counter is bumped with one conditional UPDATE. If any hostel
+    lost beds to a concurrent allocation the whole batch is rolled back.
+    """
+    hostels = {h.id: h for h in Hostel.query.all()}
+    free = {h.id: max((h.capacity or 0) - (h.students_residing or 0), 0) for h in hostels.values()}
+
+    ids = [sid for sid, _ in requests]
+    students = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        for sid, gender, hostel_id in db.session.query(Student.id, Student.gender, Student.hostel_id) \
+                .filter(Student.id.in_(chunk)):
+            students[sid] = (gender, hostel_id)
+
+    placed, unplaced, taken = {}, [], {}
+    for sid, preferences in requests:
+        if sid not in students or students[sid][1] is not None or sid in placed:
+            continue
+        gender = students[sid][0]
+        for hid in preferences:
+            if free.get(hid, 0) > 0 and accepts(hostels[hid].type, gender):
+                free[hid] -= 1
+                taken[hid] = taken.get(hid, 0) + 1
+                placed[sid] = hid
+                break
+        else:
+            unplaced.append(sid)
+
+    try:
+        for hid, n in taken.items():
+            if not _take_beds(hid, n):
+                raise AllocationError(f"{hostels[hid].name} filled up during allocation, rerun the batch.")
+        if placed:
+            student_table = Student.__table__
+            moved = db.session.execute(
+                update(student_table)
+                .where(student_table.c.id == bindparam("sid"), student_table.c.hostel_id.is_(None))
+                .values(hostel_id=bindparam("hid")),
+                [{"sid": s, "hid": h} for s, h in placed.items()],
+            ).rowcount
+            if moved != len(placed):
+                raise AllocationError("Some students were allocated elsewhere meanwhile, rerun the batch.")
+
+            by_hostel = {}
+            for sid, hid in placed.items():
+                by_hostel.setdefault(hid, []).append(sid)
+            for hid, sids in by_hostel.items():
+                record("student", sids, "update", {"hostel_id": [None, hid]})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire_all()
+    return placed, unplaced
+
+
+def recount_occupancy():
+    """Reset every hostel's counter to the number of students linked to it."""
+    counts = dict(
+        db.session.query(Student.hostel_id, db.func.count())
+        .filter(Student.hostel_id.isnot(None))
+        .group_by(Student.hostel_id)
+    )
+    hostel_table = Hostel.__table__
+    db.session.execute(
+        update(hostel_table)
+        .where(hostel_table.c.id == bindparam("hid"))
+        .values(students_residing=bindparam("n")),
+        [{"hid": hid, "n": counts.get(hid, 0)} for (hid,) in db.session.query(Hostel.id)],
+    )
+    db.session.commit()
+    return counts
@@ -0,0 +1,90 @@
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import Department, Enrollment, Hostel, Placement, Programme, Staff, Student
+from .read_models import head_count
+
+
+# =====================================================
+# DASHBOARD KPIs
+# =====================================================
+# All totals come from one SELECT of scalar subqueries, cached per worker for
+# CACHE_TTL seconds. A commit that wrote anything drops this worker's copy at
+# once; other workers pick the change up when their TTL runs out.
+CACHE_TTL = 30
+
+_cache = {"value": None, "expires": 0.0}
+
+
+def _scalar(expr, model, *where):
+    return select(expr).select_from(model).where(*where).scalar_subquery()
+
+
+def compute():
+    totals = db.session.execute(select(
+        # Rollover sets graduated_year; only students without one are enrolled
+        _scalar(db.func.count(), Student, Student.graduated_year.is_(None)).label("students"),
+        _scalar(db.func.count(), Student, Student.graduated_year.isnot(None)).label("graduates"),
+        _scalar(db.func.count(), Department).label("departments"),
+        _scalar(db.func.count(), Programme).label("programmes"),
+        _scalar(db.func.coalesce(db.func.sum(head_count(Staff)), 0), Staff).label("staff_strength"),
+        _scalar(db.func.coalesce(db.func.sum(Staff.sanctioned_strength), 0), Staff).label("staff_sanctioned"),
+        _scalar(db.func.coalesce(db.func.sum(Hostel.capacity), 0), Hostel).label("hostel_capacity"),
+        _scalar(db.func.coalesce(db.func.sum(Hostel.students_residing), 0), Hostel).label("hostel_residents"),
+        _scalar(db.func.count(), Placement).label("placements"),
+    )).one()._asdict()
+    totals = {k: int(v or 0) for k, v in totals.items()}  # legacy rows hold "2.0" etc.
+
+    capacity = totals["hostel_capacity"]
+    totals["hostel_occupancy_pct"] = round(totals["hostel_residents"] * 100 / capacity, 1) if capacity else 0
+
+    by_year = (
+        db.session.query(Enrollment.year, db.func.sum(head_count(Enrollment)))
+        .group_by(Enrollment.year)
+        .order_by(Enrollment.year)
+        .all()
+    )
+    totals["enrollment_by_year"] = [(year, total or 0) for year, total in by_year if year is not None]
+    return totals
+
+
+def get():
+    """Cached KPI dict for the dashboard."""
+    now = time.monotonic()
+    if _cache["value"] is None or now >= _cache["expires"]:
+        _cache["value"] = compute()
+        _cache["expires"] = now + CACHE_TTL
+    return _cache["value"]
+
+
+def invalidate():
+    _cache["value"] = None
+
+
+# -------------------------
+# Invalidate on write
+# -------------------------
+@event.listens_for(Session, "after_flush")
+def _mark_flush(session, flush_context):
+    session.info["kpis_stale"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement(orm_execute_state):
+    # Set-based UPDATE/DELETE (e.g. hostel bed counters) skip the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["kpis_stale"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("kpis_stale", False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_mark(session):
+    session.info.pop("kpis_stale", None)
@@ -0,0 +1,175 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from . import db
+from .audit import change_head
+from .models import MaintenanceRun
+
+
+# =====================================================
+# DATABASE MAINTENANCE
+# =====================================================
+# Keeps planner statistics fresh and hands free pages back to the OS.
+# `flask maintain` runs it from cron; besides that every worker checks, at
+# most once per CHECK_INTERVAL, whether enough has changed since the last
+# run (audit_log entries, free pages, age) and if so runs it on a
+# background thread. The audit_log sequence doubles as the change counter.
+CHECK_INTERVAL = 60                 # seconds between checks per worker
+CHANGE_THRESHOLD = 5000             # audit entries since the last run
+FREELIST_THRESHOLD = 0.10           # share of the file sitting on the freelist
+MAX_AGE = timedelta(days=1)         # run at least this often
+ANALYSIS_LIMIT = 1000               # rows sampled per index by ANALYZE
+VACUUM_STEP = 2000                  # pages released per incremental vacuum
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+_lock = threading.Lock()
+_next_check = {"at": 0.0}
+
+
+def stats(conn):
+    """Page counts and vacuum mode of the live file."""
+    def pragma(name):
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+    pages, free, size = pragma("page_count"), pragma("freelist_count"), pragma("page_size")
+    return {
+        "page_count": pages,
+        "freelist_count": free,
+        "page_size": size,
+        "size_bytes": pages * size,
+        "freelist_ratio": round(free / pages, 4) if pages else 0.0,
+        "auto_vacuum": AUTO_VACUUM_MODES.get(pragma("auto_vacuum"), "unknown"),
+        "has_statistics": bool(conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").scalar()),
+    }
+
+
+def last_run():
+    return MaintenanceRun.query.order_by(MaintenanceRun.id.desc()).first()
+
+
+def due(current, last, head):
+    """Why maintenance should run now ("threshold" / "schedule"), or None."""
+    if last is None or datetime.utcnow() - last.ran_at >= MAX_AGE:
+        return "schedule"
+    if head - last.audit_head >= CHANGE_THRESHOLD:
+        return "threshold"
+    if current["auto_vacuum"] == "incremental" and current["freelist_ratio"] >= FREELIST_THRESHOLD:
+        return "threshold"
+    return None
+
+
+def run(trigger="manual", analyze=None, vacuum_pages=VACUUM_STEP):
+    """
+    PRAGMA optimize, plus a bounded ANALYZE when `analyze` is true (default:
+    when CHANGE_THRESHOLD was passed or there are no statistics yet), plus an
+    incremental vacuum of up to `vacuum_pages` pages. Returns the MaintenanceRun.
+    """
+    start = time.perf_counter()
+    head = change_head()
+    last = last_run()
+
+    with db.engine.connect() as conn:
+        before = stats(conn)
+        if analyze is None:
+            analyze = not before["has_statistics"] or last is None \
+                or head - last.audit_head >= CHANGE_THRESHOLD
+        if analyze:
+            conn.exec_driver_sql(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            conn.exec_driver_sql("ANALYZE")
+        conn.exec_driver_sql("PRAGMA optimize")
+        if before["auto_vacuum"] == "incremental" and before["freelist_count"]:
+            # execute() steps the pragma once, i.e. frees one page; executescript
+            # runs it to completion
+            conn.connection.dbapi_connection.executescript(
+                f"PRAGMA incremental_vacuum({int(vacuum_pages)})")
+        conn.commit()
+        after = stats(conn)
+
+    entry = MaintenanceRun(
+        trigger=trigger, audit_head=head, analyzed=bool(analyze),
+        pages_before=before["page_count"], freelist_before=before["freelist_count"],
+        pages_after=after["page_count"], freelist_after=after["freelist_count"],
+        duration_ms=int((time.perf_counter() - start) * 1000),
+    )
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+
+def enable_incremental_vacuum():
+    """Switch the file to auto_vacuum=INCREMENTAL. Rewrites the whole file (VACUUM)."""
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.commit()
+        conn.exec_driver_sql("VACUUM")
+        return stats(conn)
+
+
+# -------------------------
+# Threshold check after requests
+# -------------------------
+def _run_in_background(app, trigger):
+    def work():
+        try:
+            with app.app_context():
+                run(trigger)
+        except Exception:
+            app.logger.exception("Database maintenance failed")
+        finally:
+            _lock.release()
+
+    threading.Thread(target=work, name="db-maintenance", daemon=True).start()
+
+
+def check():
+    """Start a background run if one is due. Cheap; called after requests."""
+    now = time.monotonic()
+    if now < _next_check["at"] or not _lock.acquire(blocking=False):
+        return None
+    _next_check["at"] = now + CHECK_INTERVAL
+    try:
+        with db.engine.connect() as conn:
+            reason = due(stats(conn), last_run(), change_head())
+    except Exception:
+        _lock.release()
+        current_app.logger.exception("Maintenance check failed")
+        return None
+    if reason is None:
+        _lock.release()
+        return None
+    _run_in_background(current_app._get_current_object(), reason)
+    return reason
+
+
+def health():
+    """Database figures and maintenance state for /api/health."""
+    with db.engine.connect() as conn:
+        current = stats(conn)
+    last, head = last_run(), change_head()
+    reason = due(current, last, head)
+    return {
+        "status": "maintenance_due" if reason else "ok",
+        "due": reason,
+        "database": current,
+        "changes_since_maintenance": head - (last.audit_head if last else 0),
+        "last_maintenance": None if last is None else {
+            "ran_at": last.ran_at.isoformat(),
+            "trigger": last.trigger,
+            "analyzed": last.analyzed,
+            "duration_ms": last.duration_ms,
+            "freelist_before": last.freelist_before,
+            "freelist_after": last.freelist_after,
+        },
+    }
+
+
+def init_app(app):
+    @app.after_request
+    def _maintenance_check(response):
+        check()
+        return response
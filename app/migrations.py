@@ -0,0 +1,267 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+from . import db
+from .dates import parse_date, parse_year
+from .models import Student, Enrollment, ExamResult, Placement, NSSEnrollment, Programme, AuditLog, Scholarship
+from .references import ReferenceIndex
+
+
+# =====================================================
+# SCHEMA UPGRADES FOR EXISTING DATABASES
+# =====================================================
+# db.create_all() only creates missing tables, so columns added to models
+# later are listed here and added in place. Every step is idempotent.
+ADDED_COLUMNS = [
+    # (table, column, DDL type)
+    ("student", "department_id", "INTEGER REFERENCES department (id)"),
+    ("student", "programme_id", "INTEGER REFERENCES programme (id)"),
+    ("enrollment", "programme_id", "INTEGER REFERENCES programme (id)"),
+    ("exam_result", "programme_id", "INTEGER REFERENCES programme (id)"),
+    ("student", "hostel_id", "INTEGER REFERENCES hostel (id)"),
+    ("student", "graduated_year", "INTEGER"),
+    ("student", "category", "VARCHAR(10)"),
+    ("student", "annual_income", "INTEGER"),
+    ("scholarship", "programme_id", "INTEGER REFERENCES programme (id)"),
+    ("scholarship", "year_min", "INTEGER"),
+    ("scholarship", "year_max", "INTEGER"),
+    ("scholarship", "categories", "VARCHAR(100)"),
+    ("scholarship", "genders", "VARCHAR(100)"),
+    ("scholarship", "income_min", "INTEGER"),
+    ("scholarship", "income_max", "INTEGER"),
+    ("exam_result", "session_year", "INTEGER"),
+    ("exam_result", "semester", "INTEGER"),
+    ("exam_result", "appeared", "INTEGER"),
+    ("exam_result", "generated", "BOOLEAN NOT NULL DEFAULT 0"),
+]
+
+ADDED_INDEXES = [
+    # (index name, table, column)
+    ("ix_student_department_id", "student", "department_id"),
+    ("ix_student_programme_id", "student", "programme_id"),
+    ("ix_enrollment_programme_id", "enrollment", "programme_id"),
+    ("ix_exam_result_programme_id", "exam_result", "programme_id"),
+    ("ix_student_hostel_id", "student", "hostel_id"),
+    ("ix_student_graduated_year", "student", "graduated_year"),
+]
+
+
+def upgrade_schema():
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{column}" {ddl}'))
+
+        for name, table, column in ADDED_INDEXES:
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ("{column}")'))
+
+        # Indexes declared in models.py on tables that already existed
+        for model_table in db.metadata.sorted_tables:
+            for index in model_table.indexes:
+                index.create(conn, checkfirst=True)
+
+    # One-off data migrations, tracked in the SQLite header (PRAGMA user_version)
+    with db.engine.begin() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        for number, step in enumerate(DATA_MIGRATIONS, start=1):
+            if number > version:
+                step(conn)
+                conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+
+
+def rebuild_table(conn, model):
+    """
+    Recreate `model`'s table from the current model definition and copy the
+    rows across — SQLite cannot change a column's declared type in place.
+    """
+    table = model.__table__
+    name = table.name
+
+    old_columns = {c["name"] for c in inspect(conn).get_columns(name)}
+    columns = ", ".join(f'"{c.name}"' for c in table.columns if c.name in old_columns)
+
+    ddl = str(CreateTable(table).compile(conn))
+    conn.execute(text(ddl.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {name}__new ", 1)))
+    conn.execute(text(f"INSERT INTO {name}__new ({columns}) SELECT {columns} FROM {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))
+    conn.execute(text(f"ALTER TABLE {name}__new RENAME TO {name}"))
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+# -------------------------
+# 1. String dates → DATE columns
+# -------------------------
+TYPED_DATE_COLUMNS = [
+    # (model, column, parser, serializer)
+    (Student, "dob", parse_date, lambda d: d.isoformat()),
+    (Placement, "date", parse_date, lambda d: d.isoformat()),
+    (NSSEnrollment, "date", parse_date, lambda d: d.isoformat()),
+    (Programme, "year_of_start", parse_year, int),
+]
+
+
+def _migrate_typed_dates(conn):
+    """
+    Normalise legacy strings to ISO dates / integer years, then rebuild the
+    tables so the columns are declared DATE / INTEGER and indexed. Values
+    that cannot be parsed are kept in `legacy_value` and set to NULL.
+    """
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS legacy_value ("
+        " id INTEGER PRIMARY KEY, table_name VARCHAR(50), row_id INTEGER,"
+        " column_name VARCHAR(50), value TEXT)"
+    ))
+
+    for model, column, parse, serialize in TYPED_DATE_COLUMNS:
+        table = model.__tablename__
+        rows = conn.execute(text(
+            f'SELECT id, "{column}" FROM {table} WHERE "{column}" IS NOT NULL'
+        )).all()
+
+        updates, lost = [], []
+        for row_id, raw in rows:
+            parsed = parse(raw)
+            if parsed is not None:
+                updates.append({"id": row_id, "v": serialize(parsed)})
+            else:
+                updates.append({"id": row_id, "v": None})
+                if str(raw).strip():
+                    lost.append({"t": table, "id": row_id, "c": column, "v": str(raw)})
+
+        if updates:
+            conn.execute(text(f'UPDATE {table} SET "{column}" = :v WHERE id = :id'), updates)
+        if lost:
+            conn.execute(text(
+                "INSERT INTO legacy_value (table_name, row_id, column_name, value) "
+                "VALUES (:t, :id, :c, :v)"
+            ), lost)
+
+        rebuild_table(conn, model)
+
+
+# -------------------------
+# 2. audit_log ids never reused (change feed sequence)
+# -------------------------
+def _audit_log_autoincrement(conn):
+    rebuild_table(conn, AuditLog)
+
+
+# -------------------------
+# 3. Initial fill of the chart rollups
+# -------------------------
+def _fill_rollups(conn):
+    from .rollups import rebuild
+    rebuild(conn)
+
+
+# -------------------------
+# 4. Scholarship.amount text → INTEGER rupees, then first eligibility pass
+# -------------------------
+def _migrate_scholarship_amounts(conn):
+    from .scholarships import parse_amount
+
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS legacy_value ("
+        " id INTEGER PRIMARY KEY, table_name VARCHAR(50), row_id INTEGER,"
+        " column_name VARCHAR(50), value TEXT)"
+    ))
+    updates, lost = [], []
+    for row_id, raw in conn.execute(text("SELECT id, amount FROM scholarship WHERE amount IS NOT NULL")):
+        amount = parse_amount(raw)
+        updates.append({"id": row_id, "v": amount})
+        if amount is None and str(raw).strip():
+            lost.append({"t": "scholarship", "id": row_id, "c": "amount", "v": str(raw)})
+    if updates:
+        conn.execute(text("UPDATE scholarship SET amount = :v WHERE id = :id"), updates)
+    if lost:
+        conn.execute(text(
+            "INSERT INTO legacy_value (table_name, row_id, column_name, value) "
+            "VALUES (:t, :id, :c, :v)"
+        ), lost)
+    rebuild_table(conn, Scholarship)
+
+
+def _fill_eligibility(conn):
+    from .scholarships import rebuild
+    rebuild(conn)
+
+
+DATA_MIGRATIONS = [
+    _migrate_typed_dates,
+    _audit_log_autoincrement,
+    _fill_rollups,
+    _migrate_scholarship_amounts,
+    _fill_eligibility,
+]
+
+
+# =====================================================
+# BACKFILL: free-text department / programme → ids
+# =====================================================
+def backfill_foreign_keys(dry_run=False):
+    """
+    Match the legacy free-text columns against Department / Programme and
+    fill the id columns. Works per distinct string, not per row, so the
+    cost is one UPDATE per distinct value.
+
+    Returns {table: {"matched": rows, "unmatched": {value: rows}}}.
+    """
+    refs = ReferenceIndex.load()
+    report = {}
+
+    # Students: department narrows down programmes that share a name
+    pairs = (
+        db.session.query(Student.department, Student.programme, db.func.count())
+        .filter(Student.programme_id.is_(None))
+        .group_by(Student.department, Student.programme)
+        .all()
+    )
+    updates, matched, unmatched = [], 0, {}
+    for department, programme, n in pairs:
+        dept_id, prog_id = refs.resolve(department, programme)
+        if prog_id is None and dept_id is None:
+            unmatched[f"{department} / {programme}"] = n
+            continue
+        matched += n
+        updates.append({"d": department, "p": programme, "dept_id": dept_id, "prog_id": prog_id})
+
+    if updates and not dry_run:
+        db.session.execute(text(
+            "UPDATE student SET department_id = :dept_id, programme_id = :prog_id "
+            "WHERE department IS :d AND programme IS :p AND programme_id IS NULL"
+        ), updates)
+    report["student"] = {"matched": matched, "unmatched": unmatched}
+
+    # Enrollment / ExamResult only carry a programme name
+    for model in (Enrollment, ExamResult):
+        table = model.__tablename__
+        values = (
+            db.session.query(model.programme, db.func.count())
+            .filter(model.programme_id.is_(None))
+            .group_by(model.programme)
+            .all()
+        )
+        updates, matched, unmatched = [], 0, {}
+        for programme, n in values:
+            prog_id = refs.programme_id(programme)
+            if prog_id is None:
+                unmatched[programme] = n
+                continue
+            matched += n
+            updates.append({"p": programme, "prog_id": prog_id})
+
+        if updates and not dry_run:
+            db.session.execute(text(
+                f"UPDATE {table} SET programme_id = :prog_id "
+                "WHERE programme IS :p AND programme_id IS NULL"
+            ), updates)
+        report[table] = {"matched": matched, "unmatched": unmatched}
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return report
@@ -1,3 +1,5 @@
+import json
+
 from . import db
 from datetime import datetime
 
@@ -5,27 +7,63 @@ from datetime import datetime
 # STUDENT MODEL
 # -------------------------
 class Student(db.Model):
+    __table_args__ = (
+        # Case-insensitive prefix search (LIKE 'abc%') for the student picker
+        db.Index("ix_student_roll_no_nocase", db.text("roll_no COLLATE NOCASE")),
+        db.Index("ix_student_name_nocase", db.text("name COLLATE NOCASE")),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     roll_no = db.Column(db.String(10), unique=True, nullable=False)
     name = db.Column(db.String(20), nullable=False)
     email = db.Column(db.String(15))
     phone = db.Column(db.String(10))
-    dob = db.Column(db.String(20))
+    dob = db.Column(db.Date, index=True)
     gender = db.Column(db.String(20))
     address = db.Column(db.String(300))  
     
 
+    # Free-text labels as entered; department_id / programme_id are the join keys
     department = db.Column(db.String(200))
     programme = db.Column(db.String(200))
+    department_id = db.Column(db.Integer, db.ForeignKey("department.id"), index=True)
+    programme_id = db.Column(db.Integer, db.ForeignKey("programme.id"), index=True)
     year = db.Column(db.Integer)
     # bus = db.Column(db.String(30))
 
+    # Current hostel bed (see hostel_allocation.py — never set directly)
+    hostel_id = db.Column(db.Integer, db.ForeignKey("hostel.id"), index=True)
+
+    # Start year of the session the student graduated in (see rollover.py)
+    graduated_year = db.Column(db.Integer, index=True)
+
+    # Scholarship eligibility inputs (see scholarships.py)
+    category = db.Column(db.String(10))          # GEN / EWS / SC / ST / OBC
+    annual_income = db.Column(db.Integer)        # family income, rupees per year
+
     profile_pic = db.Column(db.String(300), default="default.png")
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationship → Each student can have multiple enrollments
     enrollments = db.relationship("Enrollment", backref="student", lazy=True)
+    # Computed term results, oldest first (see results.py)
+    term_results = db.relationship(
+        "TermResult", lazy=True, viewonly=True,
+        order_by="[TermResult.session_year, TermResult.semester]",
+    )
+
+    dept = db.relationship("Department", lazy=True)
+    prog = db.relationship("Programme", lazy=True)
+    hostel = db.relationship("Hostel", backref=db.backref("residents", lazy="dynamic"), lazy=True)
+
+    @property
+    def department_name(self):
+        return self.dept.name if self.dept else self.department
+
+    @property
+    def programme_name(self):
+        return self.prog.programme if self.prog else self.programme
 
     def __repr__(self):
         return f"<Student {self.roll_no} - {self.name}>"
@@ -47,11 +85,16 @@ class Hostel(db.Model):
     type = db.Column(db.String(80))
 
     # Capacity + number of students currently residing
+    # (students_residing is maintained by hostel_allocation.py)
     capacity = db.Column(db.Integer, default=0)
     students_residing = db.Column(db.Integer, default=0)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @property
+    def free_beds(self):
+        return max((self.capacity or 0) - (self.students_residing or 0), 0)
+
     def __repr__(self):
         return f"<Hostel {self.name}>"
 
@@ -84,7 +127,7 @@ class Programme(db.Model):
     # General programme info
     programme = db.Column(db.String(200), nullable=False)   # programme name
     level = db.Column(db.String(80))                        # UG/PG/Diploma etc.
-    year_of_start = db.Column(db.String(20))
+    year_of_start = db.Column(db.Integer, index=True)
     admission_criteria = db.Column(db.String(200))
     duration_years = db.Column(db.Integer)
     duration_months = db.Column(db.Integer)
@@ -121,6 +164,7 @@ class Enrollment(db.Model):
     student_id = db.Column(db.Integer, db.ForeignKey("student.id"), nullable=True)
 
     programme = db.Column(db.String(200))
+    programme_id = db.Column(db.Integer, db.ForeignKey("programme.id"), index=True)
     year = db.Column(db.Integer)
     mode = db.Column(db.String(50))  
 
@@ -138,6 +182,12 @@ class Enrollment(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    prog = db.relationship("Programme", lazy=True)
+
+    @property
+    def programme_name(self):
+        return self.prog.programme if self.prog else self.programme
+
 
 # -------------------------
 # PLACEMENT MODEL
@@ -147,7 +197,7 @@ class Placement(db.Model):
 
     company = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(200))
-    date = db.Column(db.String(50))
+    date = db.Column(db.Date, index=True)
     details = db.Column(db.Text)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -243,15 +293,34 @@ class Scholarship(db.Model):
 
     # Your actual fields
     title = db.Column(db.String(200), nullable=False)
-    amount = db.Column(db.String(50))
-    criteria = db.Column(db.String(300))
+    amount = db.Column(db.Integer)               # rupees per beneficiary
+    criteria = db.Column(db.String(300))         # free-text notes; the rules below decide eligibility
+
+    # Eligibility rules — an empty rule matches everyone (see scholarships.py)
+    programme_id = db.Column(db.Integer, db.ForeignKey("programme.id"))
+    year_min = db.Column(db.Integer)
+    year_max = db.Column(db.Integer)
+    categories = db.Column(db.String(100))       # comma-separated, e.g. "SC,ST"
+    genders = db.Column(db.String(100))          # comma-separated, e.g. "Female"
+    income_min = db.Column(db.Integer)
+    income_max = db.Column(db.Integer)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    prog = db.relationship("Programme", lazy=True)
+
     def __repr__(self):
         return f"<Scholarship {self.title}>"
 
 
+class ScholarshipEligibility(db.Model):
+    """Current matches of the rules above, kept up to date by scholarships.py."""
+    __tablename__ = "scholarship_eligibility"
+
+    scholarship_id = db.Column(db.Integer, db.ForeignKey("scholarship.id"), primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("student.id"), primary_key=True, index=True)
+
+
 # -------------------------
 # NSS MODEL
 # -------------------------
@@ -268,7 +337,7 @@ class NSSEnrollment(db.Model):
         return (self.male or 0) + (self.female or 0)
 
     activity = db.Column(db.String(255), nullable=False)
-    date = db.Column(db.String(50))
+    date = db.Column(db.Date, index=True)
     remarks = db.Column(db.Text)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -282,6 +351,7 @@ class ExamResult(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     programme = db.Column(db.String(150), nullable=False)
+    programme_id = db.Column(db.Integer, db.ForeignKey("programme.id"), index=True)
 
     # Category-wise stats
     general_male = db.Column(db.Integer, default=0)
@@ -304,8 +374,21 @@ class ExamResult(db.Model):
     obc_female = db.Column(db.Integer, default=0)
     obc_transgender = db.Column(db.Integer, default=0)
 
+    # Rows generated from student marks (see results.py): counts are students
+    # who passed the term, `appeared` is everyone with marks for it
+    session_year = db.Column(db.Integer)
+    semester = db.Column(db.Integer)
+    appeared = db.Column(db.Integer)
+    generated = db.Column(db.Boolean, nullable=False, default=False)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    prog = db.relationship("Programme", lazy=True)
+
+    @property
+    def programme_name(self):
+        return self.prog.programme if self.prog else self.programme
+
     def total(self):
         return (
             self.general_male + self.general_female + self.general_transgender +
@@ -314,3 +397,148 @@ class ExamResult(db.Model):
             self.st_male + self.st_female + self.st_transgender +
             self.obc_male + self.obc_female + self.obc_transgender
         )
+
+
+# -------------------------
+# STUDENT MARKS AND TERM RESULTS (see results.py)
+# -------------------------
+class Mark(db.Model):
+    """One course of one student in one term, as loaded from a mark sheet."""
+    __tablename__ = "mark"
+    __table_args__ = (
+        db.UniqueConstraint("student_id", "session_year", "semester", "course_code", name="uq_mark"),
+        db.Index("ix_mark_term", "session_year", "semester", "programme_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("student.id"), nullable=False)
+    programme_id = db.Column(db.Integer, db.ForeignKey("programme.id"))  # student's programme when loaded
+    session_year = db.Column(db.Integer, nullable=False)    # start year of the session
+    semester = db.Column(db.Integer, nullable=False)        # annual-system programmes: the year
+    course_code = db.Column(db.String(30), nullable=False)
+    credits = db.Column(db.Float, nullable=False)
+    max_marks = db.Column(db.Integer, nullable=False, default=100)
+    marks = db.Column(db.Float)                             # NULL = absent
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Mark {self.student_id} {self.session_year}/{self.semester} {self.course_code}>"
+
+
+class TermResult(db.Model):
+    """Computed from Mark by results.py — never edited directly."""
+    __tablename__ = "term_result"
+    __table_args__ = (
+        db.Index("ix_term_result_term", "session_year", "semester", "programme_id"),
+    )
+
+    student_id = db.Column(db.Integer, db.ForeignKey("student.id"), primary_key=True)
+    session_year = db.Column(db.Integer, primary_key=True)
+    semester = db.Column(db.Integer, primary_key=True)
+    programme_id = db.Column(db.Integer, db.ForeignKey("programme.id"))
+    credits = db.Column(db.Float, nullable=False)
+    credit_points = db.Column(db.Float, nullable=False)     # Σ credits × grade point
+    sgpa = db.Column(db.Float)
+    cgpa = db.Column(db.Float)                              # over every term up to this one
+    failed_courses = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Boolean, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# -------------------------
+# AUDIT LOG (append-only, written by audit.py)
+# -------------------------
+class AuditLog(db.Model):
+    __tablename__ = "audit_log"
+    __table_args__ = (
+        db.Index("ix_audit_log_row", "table_name", "row_id"),
+        # AUTOINCREMENT: ids are never reused, so they work as a change sequence
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)   # also the change sequence number
+    ts = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer)
+    action = db.Column(db.String(10), nullable=False)   # insert / update / delete / snapshot
+    changes = db.Column(db.Text)                        # JSON, changed columns only
+
+    def to_dict(self):
+        return {
+            "seq": self.id,
+            "ts": self.ts.isoformat() if self.ts else None,
+            "table": self.table_name,
+            "row_id": self.row_id,
+            "action": self.action,
+            "changes": json.loads(self.changes) if self.changes else {},
+        }
+
+    def __repr__(self):
+        return f"<AuditLog {self.id} {self.action} {self.table_name}#{self.row_id}>"
+
+
+# -------------------------
+# METRIC ROLLUPS (chart data, see rollups.py)
+# -------------------------
+class MetricRollup(db.Model):
+    __tablename__ = "metric_rollup"
+    __table_args__ = (
+        db.UniqueConstraint("metric", "granularity", "dimension", "bucket", name="uq_metric_rollup"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(db.String(50), nullable=False)
+    granularity = db.Column(db.String(5), nullable=False)    # day / month / year
+    dimension = db.Column(db.String(255), nullable=False, default="")  # e.g. NSS activity
+    bucket = db.Column(db.String(10), nullable=False)         # 2024-07-15 / 2024-07 / 2024
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<MetricRollup {self.metric} {self.granularity} {self.bucket}={self.value}>"
+
+
+# -------------------------
+# ACADEMIC-YEAR ROLLOVERS (see rollover.py)
+# -------------------------
+class Rollover(db.Model):
+    __tablename__ = "rollover"
+
+    session_year = db.Column(db.Integer, primary_key=True)   # start year of the finished session
+    ran_at = db.Column(db.DateTime, default=datetime.utcnow)
+    promoted = db.Column(db.Integer, nullable=False, default=0)
+    graduated = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<Rollover {self.session_year}>"
+
+
+# -------------------------
+# DATABASE MAINTENANCE RUNS (see maintenance.py)
+# -------------------------
+class MaintenanceRun(db.Model):
+    __tablename__ = "maintenance_run"
+
+    id = db.Column(db.Integer, primary_key=True)
+    ran_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    trigger = db.Column(db.String(20), nullable=False)      # manual / threshold / schedule
+    audit_head = db.Column(db.Integer, nullable=False)      # audit_log sequence at the time
+    analyzed = db.Column(db.Boolean, nullable=False, default=False)
+    pages_before = db.Column(db.Integer)
+    freelist_before = db.Column(db.Integer)
+    pages_after = db.Column(db.Integer)
+    freelist_after = db.Column(db.Integer)
+    duration_ms = db.Column(db.Integer)
+
+    def __repr__(self):
+        return f"<MaintenanceRun {self.id} {self.trigger}>"
+
+
+# -------------------------
+# CACHE VERSION STAMPS (see references.py)
+# -------------------------
+class CacheVersion(db.Model):
+    __tablename__ = "cache_version"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
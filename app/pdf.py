@@ -0,0 +1,257 @@
+import os
+
+from reportlab.platypus import Image, Paragraph, Spacer, Table
+
+from .pdf_engine import STYLES, TABLE_STYLES, build_pdf, render_report, split_rows
+from .photos import photo_path
+
+
+# =====================================================
+# PDF TEMPLATES  —  render(entity, records) -> file object
+# =====================================================
+# Column widths shared by every document of the same shape
+CARD_WIDTHS = [150, 300]
+WIDE_CARD_WIDTHS = [200, 260]
+COUNT_WIDTHS = [200, 100]
+ENROLLMENT_HISTORY_WIDTHS = [250, 100, 100]
+PHOTO_SIZE = 90   # points; the pre-sized "card" JPEG is embedded as is
+
+PROGRAMME_HEADER = ["Programme", "Level", "Year start", "Duration (Y/M)", "Exam", "Approved By",
+                    "Gen", "SC", "ST", "OBC", "EWS", "Super", "Total"]
+PROGRAMME_WIDTHS = [120, 40, 45, 70, 50, 80, 30, 30, 30, 30, 30, 45, 40]
+
+EXAM_HEADER = ["Programme", "Gen M", "Gen F", "Gen T",
+               "EWS M", "EWS F", "EWS T",
+               "SC M", "SC F", "SC T",
+               "ST M", "ST F", "ST T",
+               "OBC M", "OBC F", "OBC T"]
+
+_TEMPLATES = {}
+
+
+def template(entity):
+    def register(fn):
+        _TEMPLATES[entity] = fn
+        return fn
+    return register
+
+
+def render(entity, records):
+    """
+    Render `records` (one object or a list, depending on the entity).
+
+    Returns a file object positioned at 0 — small documents live in memory,
+    large ones in a temp file — ready to hand to send_file().
+    """
+    try:
+        fn = _TEMPLATES[entity]
+    except KeyError:
+        raise ValueError(f"No PDF template for {entity!r}")
+    return fn(records)
+
+
+# -------------------------
+# Building blocks
+# -------------------------
+def _title(text, space=12):
+    return [Paragraph(f"<b>{text}</b>", STYLES["Title"]), Spacer(1, space)]
+
+
+def _line(label, value):
+    return Paragraph(f"<b>{label}:</b> {value}", STYLES["Normal"])
+
+
+def _table(rows, widths, style="card", **kwargs):
+    table = Table(rows, colWidths=widths, **kwargs)
+    table.setStyle(TABLE_STYLES[style])
+    return table
+
+
+def _programme_row(p):
+    return [
+        p.programme,
+        p.level or "-",
+        p.year_of_start or "-",
+        f"{p.duration_years or '-'} / {p.duration_months or '-'}",
+        p.exam_system or "-",
+        p.approved_by or "-",
+        p.seats_general or 0,
+        p.seats_sc or 0,
+        p.seats_st or 0,
+        p.seats_obc or 0,
+        p.seats_ews or 0,
+        p.seats_supernumerary or 0,
+        p.seats_total()
+    ]
+
+
+def _department_notes(dept):
+    notes = []
+    if dept.code:
+        notes.append(f"Code: {dept.code}")
+    if dept.hod:
+        notes.append(f"HOD: {dept.hod}")
+    return notes
+
+
+# -------------------------
+# Entity templates
+# -------------------------
+@template("student")
+def _student(s):
+    fields = [
+        ["Roll No", s.roll_no],
+        ["Name", s.name],
+        ["Email", s.email],
+        ["Phone", s.phone],
+        ["DOB", s.dob],
+        ["Gender", s.gender],
+        ["Address", s.address],
+        ["Department", s.department_name],
+        ["Programme", s.programme_name],
+        ["Year", s.year],
+        ["Hostel", s.hostel.name if s.hostel else None],
+    ]
+    story = _title("Student Profile")
+    photo = photo_path(s, "card")
+    if photo and os.path.exists(photo):
+        story += [Image(photo, width=PHOTO_SIZE, height=PHOTO_SIZE), Spacer(1, 12)]
+    story.append(_table(fields, CARD_WIDTHS))
+
+    if s.enrollments:
+        rows = [["Programme", "Year", "Mode"]]
+        rows += [[e.programme_name, e.year, e.mode] for e in s.enrollments]
+        story += [Spacer(1, 12), Paragraph("<b>Enrollments</b>", STYLES["Heading3"]), _table(rows, ENROLLMENT_HISTORY_WIDTHS, style="grid")]
+    return build_pdf(story)
+
+
+@template("enrollment")
+def _enrollment(e):
+    story = _title("Enrollment Report")
+    story += [
+        _line("Programme", e.programme_name),
+        _line("Year", e.year),
+        _line("Mode", e.mode),
+        Spacer(1, 12),
+    ]
+
+    if e.student:
+        story += [
+            Paragraph("<b>Linked Student</b>", STYLES["Heading3"]),
+            Paragraph(f"Name: {e.student.name}", STYLES["Normal"]),
+            Paragraph(f"Roll No: {e.student.roll_no}", STYLES["Normal"]),
+            Spacer(1, 12),
+        ]
+
+    counts = [
+        ["Category", "Count"],
+        ["General Male", e.general_male],
+        ["General Female", e.general_female],
+        ["EWS Male", e.ews_male],
+        ["EWS Female", e.ews_female],
+        ["SC Male", e.sc_male],
+        ["SC Female", e.sc_female],
+        ["ST Male", e.st_male],
+        ["ST Female", e.st_female],
+        ["OBC Male", e.obc_male],
+        ["OBC Female", e.obc_female],
+        ["Transgender", e.trans_gender]
+    ]
+    story.append(_table(counts, COUNT_WIDTHS, style="grid"))
+    return build_pdf(story)
+
+
+@template("staff")
+def _staff(s):
+    fields = [
+        ["Name", s.name],
+        ["Staff Code", s.staff_code],
+        ["Type", s.staff_type or "-"],
+        ["Group", s.group or "-"],
+        ["Sanctioned Strength", s.sanctioned_strength or 0],
+        ["Total Strength", s.total_strength()],
+        ["Joined", s.formatted_join_date],
+    ]
+    return build_pdf(_title("Staff ID Card") + [_table(fields, CARD_WIDTHS)])
+
+
+@template("hostel")
+def _hostel(h):
+    story = _title(f"Hostel Report — {h.name}", space=8)
+    story += [
+        _line("Name", h.name),
+        _line("Type", h.type or "-"),
+        _line("Capacity", h.capacity),
+        _line("Students Residing", h.students_residing),
+        _line("Warden", h.warden or "-"),
+        Spacer(1, 12),
+    ]
+
+    data = [["Field", "Value"],
+            ["Name", h.name],
+            ["Type", h.type or "-"],
+            ["Capacity", str(h.capacity)],
+            ["Students Residing", str(h.students_residing)],
+            ["Warden", h.warden or "-"],
+            ["Created At", h.created_at.strftime("%d %b %Y")]]
+    story.append(_table(data, WIDE_CARD_WIDTHS, style="grid"))
+    return build_pdf(story)
+
+
+@template("placement")
+def _placement(p):
+    story = _title("Placement Report")
+    story += [
+        _line("Company", p.company),
+        _line("Role", p.role),
+        _line("Date", p.date),
+        Spacer(1, 12),
+        Paragraph("<b>Details:</b>", STYLES["Heading2"]),
+        Paragraph(p.details or "No details provided.", STYLES["Normal"]),
+    ]
+    return build_pdf(story)
+
+
+@template("department")
+def _department(records):
+    """records = (department, programmes)"""
+    dept, programmes = records
+    return render_report(
+        f"Department Report — {dept.name}",
+        PROGRAMME_HEADER,
+        [(None, _department_notes(dept), [_programme_row(p) for p in programmes])],
+        style="report",
+        col_widths=PROGRAMME_WIDTHS,
+    )
+
+
+@template("departments")
+def _departments(records):
+    """records = (departments, programmes ordered by department)"""
+    depts, programmes = records
+
+    by_dept = {}
+    for p in programmes:
+        by_dept.setdefault(p.department_id, []).append(_programme_row(p))
+
+    return render_report(
+        "University Programmes Report",
+        PROGRAMME_HEADER,
+        [(d.name, _department_notes(d), by_dept.get(d.id, [])) for d in depts],
+        style="report",
+        col_widths=PROGRAMME_WIDTHS,
+    )
+
+
+@template("exam")
+def _exam(results):
+    rows = [[
+        r.programme_name,
+        r.general_male, r.general_female, r.general_transgender,
+        r.ews_male, r.ews_female, r.ews_transgender,
+        r.sc_male, r.sc_female, r.sc_transgender,
+        r.st_male, r.st_female, r.st_transgender,
+        r.obc_male, r.obc_female, r.obc_transgender
+    ] for r in results]
+
+    return render_report("Exam Results Summary", EXAM_HEADER, split_rows(rows), style="dense")
@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from threading import Lock
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # merging is optional — without pypdf everything renders serially
+    PdfReader = PdfWriter = None
+
+
+# =====================================================
+# SHARED STYLES (built once per process)
+# =====================================================
+STYLES = getSampleStyleSheet()
+
+# Precompiled table styles, referenced by name so chunk specs stay picklable
+TABLE_STYLES = {
+    # two-column "field / value" cards
+    "card": TableStyle([
+        ("GRID", (0, 0), (-1, -1), 1, colors.grey),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ]),
+    # small tables with a header row
+    "grid": TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("GRID", (0, 0), (-1, -1), 1, colors.grey),
+        ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+    ]),
+    # programme / seat matrix reports
+    "report": TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("ALIGN", (6, 1), (-1, -1), "CENTER"),
+    ]),
+    # wide, dense count tables
+    "dense": TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ]),
+}
+
+
+# Documents up to this size stay in memory; bigger ones roll over to a temp file
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def _spool():
+    return SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+b")
+
+
+def build_pdf(story, out=None):
+    """
+    Lay out a story on A4 into `out` (a new spooled temp file by default).
+
+    Returns the file positioned at 0. The caller owns it and must close it;
+    send_file() does that once the response has been streamed.
+    """
+    out = out if out is not None else _spool()
+    SimpleDocTemplate(out, pagesize=A4).build(story)
+    out.seek(0)
+    return out
+
+
+def _chunk_bytes(spec):
+    # Worker processes hand their piece back by value
+    with render_chunk(spec) as f:
+        return f.read()
+
+
+# =====================================================
+# PARALLEL PDF ENGINE (large tabular reports)
+# =====================================================
+# Reports with fewer rows than this are rendered in-process; pool start-up
+# and merging would cost more than they save.
+PARALLEL_MIN_ROWS = 2000
+CHUNK_ROWS = 1000
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Never fork the running server: the child would inherit its threads'
+            # locks and open DB connections mid-use. Workers start clean instead.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=context)
+        return _pool
+
+
+def render_chunk(spec):
+    """
+    Render one self-contained piece of a report to a PDF file object.
+
+    `spec` holds only plain data so it can be shipped to a worker process:
+      title        — document title (first chunk only), or None
+      header       — table header row
+      col_widths   — column widths or None
+      style        — name of a TABLE_STYLES entry
+      sections     — list of (heading, notes, rows)
+    """
+    story = []
+
+    if spec.get("title"):
+        story.append(Paragraph(f"<b>{spec['title']}</b>", STYLES["Title"]))
+        story.append(Spacer(1, 12))
+
+    for i, (heading, notes, rows) in enumerate(spec["sections"]):
+        if i and spec.get("page_per_section"):
+            story.append(PageBreak())
+        if heading:
+            story.append(Paragraph(f"<b>{heading}</b>", STYLES["Heading2"]))
+        for note in notes or []:
+            story.append(Paragraph(note, STYLES["Normal"]))
+        if heading or notes:
+            story.append(Spacer(1, 8))
+
+        table = Table([spec["header"]] + rows, colWidths=spec.get("col_widths"), repeatRows=1)
+        table.setStyle(TABLE_STYLES[spec["style"]])
+        story.append(table)
+        story.append(Spacer(1, 12))
+
+    return build_pdf(story)
+
+
+def split_rows(rows, size=CHUNK_ROWS):
+    """Split a flat list of rows into (None, None, chunk) sections."""
+    return [(None, None, rows[i:i + size]) for i in range(0, len(rows), size)] or [(None, None, [])]
+
+
+def render_report(title, header, sections, style="dense", col_widths=None, page_per_section=False):
+    """
+    Render a (possibly very large) tabular report.
+
+    Sections are packed into chunks of roughly CHUNK_ROWS rows, each chunk is
+    rendered in a separate process and the pages are merged in order. Small
+    reports, or installs without pypdf, take the single-process path.
+    """
+    base = {"header": header, "col_widths": col_widths, "style": style,
+            "page_per_section": page_per_section}
+    total_rows = sum(len(rows) for _, _, rows in sections)
+
+    if total_rows < PARALLEL_MIN_ROWS or PdfWriter is None or (os.cpu_count() or 1) < 2:
+        return render_chunk(dict(base, title=title, sections=sections))
+
+    # Sections bigger than one chunk are continued without repeating the heading
+    pieces = []
+    for heading, notes, rows in sections:
+        for i in range(0, max(len(rows), 1), CHUNK_ROWS):
+            pieces.append((heading, notes, rows[i:i + CHUNK_ROWS]) if i == 0
+                          else (None, None, rows[i:i + CHUNK_ROWS]))
+
+    chunks, current, current_rows = [], [], 0
+    for section in pieces:
+        if current and current_rows + len(section[2]) > CHUNK_ROWS:
+            chunks.append(current)
+            current, current_rows = [], 0
+        current.append(section)
+        current_rows += len(section[2])
+    if current:
+        chunks.append(current)
+
+    specs = [dict(base, title=title if i == 0 else None, sections=c) for i, c in enumerate(chunks)]
+
+    writer = PdfWriter()
+    for part in _get_pool().map(_chunk_bytes, specs):
+        writer.append(PdfReader(BytesIO(part)))
+    out = _spool()
+    writer.write(out)
+    out.seek(0)
+    return out
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from flask import current_app, request, url_for
+from sqlalchemy import update
+
+from . import db
+from .audit import record
+from .models import Student
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # uploads need Pillow; pages still render with the placeholder
+    Image = ImageOps = None
+
+
+# =====================================================
+# PROFILE PHOTOS
+# =====================================================
+# Uploads are checked in the request, then resized on a small thread pool
+# into fixed sizes stored under static/photos/<ab>/<sha256>-<size>.jpg.
+# Student.profile_pic holds the content hash and is only set once every size
+# exists, so pages never link to a file that is still being written. Files
+# are content-addressed, so they are served with a one-year immutable
+# Cache-Control and identical uploads share the same files.
+SIZES = {
+    # name: (width, height) in pixels, centre-cropped
+    "thumb": (64, 64),      # list views
+    "card": (240, 240),     # profile page / ID card / PDF
+}
+JPEG_QUALITY = 85
+
+MAX_UPLOAD_BYTES = 8 * 1024 * 1024
+MAX_PIXELS = 40_000_000              # refuse decompression bombs before decoding
+MIN_SIDE = 64
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP"}
+
+PHOTO_MAX_AGE = 365 * 24 * 3600
+PLACEHOLDER = "img/kashmir_logo.png"
+LEGACY_DEFAULT = "default.png"       # Student.profile_pic default: no photo
+RESIZE_WORKERS = 2
+IMPORT_BATCH = 32                    # bulk imports wait for each batch before reading more
+
+_pool = None
+_pool_lock = Lock()
+
+
+class PhotoError(Exception):
+    pass
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(RESIZE_WORKERS, thread_name_prefix="photos")
+        return _pool
+
+
+def _relative(digest, size):
+    return f"photos/{digest[:2]}/{digest}-{size}.jpg"
+
+
+def has_photo(student):
+    return bool(student.profile_pic) and student.profile_pic != LEGACY_DEFAULT
+
+
+def photo_path(student, size="card"):
+    """Filesystem path of a pre-sized photo, or None (for the PDF renderers)."""
+    if not has_photo(student):
+        return None
+    return os.path.join(current_app.static_folder, _relative(student.profile_pic, size))
+
+
+def photo_url(student, size="thumb"):
+    """Template helper: URL of the pre-sized photo, or the placeholder."""
+    if not has_photo(student):
+        return url_for("static", filename=PLACEHOLDER)
+    return url_for("static", filename=_relative(student.profile_pic, size))
+
+
+# -------------------------
+# Upload
+# -------------------------
+def validate(data):
+    """Check an upload without decoding it fully. Returns the content hash."""
+    if Image is None:
+        raise PhotoError("Photo uploads need Pillow (pip install Pillow).")
+    if not data:
+        raise PhotoError("No file uploaded.")
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise PhotoError(f"Photos must be under {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+    try:
+        with Image.open(BytesIO(data)) as img:
+            fmt, (width, height) = img.format, img.size
+            if fmt not in ALLOWED_FORMATS:
+                raise PhotoError(f"Unsupported format {fmt}; use JPEG, PNG or WebP.")
+            if width * height > MAX_PIXELS:
+                raise PhotoError("Image is too large.")
+            img.verify()
+    except PhotoError:
+        raise
+    except Exception:
+        raise PhotoError("The file is not a readable image.")
+    if min(width, height) < MIN_SIDE:
+        raise PhotoError(f"Photos must be at least {MIN_SIDE}×{MIN_SIDE} pixels.")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_sizes(root, digest, data):
+    """Render every size that is not on disk yet (atomic rename per file)."""
+    missing = {name: box for name, box in SIZES.items()
+               if not os.path.exists(os.path.join(root, _relative(digest, name)))}
+    if not missing:
+        return
+    with Image.open(BytesIO(data)) as img:
+        # JPEGs much larger than the biggest size are decoded at 1/2, 1/4 or 1/8 scale
+        img.draft("RGB", max(missing.values()))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        for name, box in missing.items():
+            target = os.path.join(root, _relative(digest, name))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".part")
+            with os.fdopen(fd, "wb") as out:
+                ImageOps.fit(img, box, Image.LANCZOS).save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            os.chmod(tmp, 0o644)  # mkstemp creates 0600; the web server must be able to read it
+            os.replace(tmp, target)
+
+
+def _process(app, student_id, digest, data):
+    _write_sizes(app.static_folder, digest, data)
+    with app.app_context():
+        previous = db.session.query(Student.profile_pic).filter(Student.id == student_id).scalar()
+        updated = db.session.execute(
+            update(Student).where(Student.id == student_id).values(profile_pic=digest)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if updated:
+            record("student", [student_id], "update", {"profile_pic": [previous, digest]})
+        db.session.commit()
+    return digest
+
+
+def _log_failure(app, student_id):
+    def callback(future):
+        # Nobody waits on uploads from the web page: failures would go unnoticed
+        if future.exception() is not None:
+            app.logger.error("Resizing the photo of student %s failed", student_id,
+                             exc_info=future.exception())
+    return callback
+
+
+def submit(student_id, data):
+    """Validate `data` and queue the resize. Returns a Future of the content hash."""
+    digest = validate(data)
+    app = current_app._get_current_object()
+    future = _get_pool().submit(_process, app, student_id, digest, data)
+    future.add_done_callback(_log_failure(app, student_id))
+    return future
+
+
+# -------------------------
+# Cache headers
+# -------------------------
+def init_app(app):
+    app.add_template_global(photo_url)
+
+    @app.after_request
+    def _photo_cache_headers(response):
+        if request.endpoint == "static" and response.status_code == 200 \
+                and (request.view_args or {}).get("filename", "").startswith("photos/"):
+            response.cache_control.public = True
+            response.cache_control.max_age = PHOTO_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
@@ -0,0 +1,30 @@
+from sqlalchemy.orm import joinedload, selectinload
+
+from .models import Enrollment, Student
+
+
+# =====================================================
+# STUDENT PROFILE LOADER
+# =====================================================
+# Every relation the profile page and the profile PDF show, and how it is
+# loaded. The many-to-one links and the (short) enrollment list are all
+# joined, so a profile is a single SELECT however many sections it has
+# (plus one for term results).
+# Add new relations here, not as lazy loads in the templates.
+STUDENT_PROFILE_OPTIONS = (
+    joinedload(Student.dept),
+    joinedload(Student.prog),
+    joinedload(Student.hostel),
+    joinedload(Student.enrollments).joinedload(Enrollment.prog),
+    # A second collection would multiply the joined rows: one extra IN query instead
+    selectinload(Student.term_results),
+)
+
+
+def load_student_profile(student_id):
+    """Student `student_id` with everything the profile shows, or 404."""
+    return (
+        Student.query.options(*STUDENT_PROFILE_OPTIONS)
+        .filter(Student.id == student_id)
+        .first_or_404()
+    )
@@ -0,0 +1,86 @@
+from collections import namedtuple
+from functools import reduce
+
+from . import db
+from .models import Enrollment, ExamResult, Programme, Staff
+
+
+# =====================================================
+# READ MODELS — plain rows for list pages
+# =====================================================
+# List pages only show a handful of columns and a total per row. These
+# queries select exactly those columns, compute the totals in SQL and
+# return namedtuples: no identity map, no change tracking, no lazy loads.
+# Edit and profile pages keep using the ORM entities.
+def count_columns(model):
+    """The category × gender count columns of `model`, in table order."""
+    return [c for c in model.__table__.c
+            if c.name.endswith(("_male", "_female", "_transgender")) or c.name == "trans_gender"]
+
+
+def head_count(model):
+    """SQL expression: sum of every count column (NULL counts as 0)."""
+    return reduce(lambda a, b: a + b, (db.func.coalesce(c, 0) for c in count_columns(model)))
+
+
+def _programme_name(model):
+    return db.func.coalesce(Programme.programme, model.programme).label("programme_name")
+
+
+# -------------------------
+# Staff
+# -------------------------
+StaffRow = namedtuple("StaffRow", "id name staff_type group sanctioned_strength total_strength")
+
+
+def staff_rows():
+    query = db.session.query(
+        Staff.id, Staff.name, Staff.staff_type, Staff.group,
+        db.func.coalesce(Staff.sanctioned_strength, 0),
+        head_count(Staff),
+    ).order_by(Staff.name.asc())
+    return [StaffRow(*row) for row in query]
+
+
+def staff_totals():
+    """(total sanctioned, total in position) over all staff rows."""
+    sanctioned, strength = db.session.query(
+        db.func.coalesce(db.func.sum(Staff.sanctioned_strength), 0),
+        db.func.coalesce(db.func.sum(head_count(Staff)), 0),
+    ).one()
+    return int(sanctioned), int(strength)  # legacy rows store "2.0"
+
+
+# -------------------------
+# Exam results
+# -------------------------
+ExamRow = namedtuple(
+    "ExamRow", ["id", "programme_name", "generated", "session_year", "semester"]
+    + [c.name for c in count_columns(ExamResult)] + ["total"])
+
+
+def exam_rows():
+    query = (
+        db.session.query(ExamResult.id, _programme_name(ExamResult), ExamResult.generated,
+                         ExamResult.session_year, ExamResult.semester,
+                         *count_columns(ExamResult), head_count(ExamResult))
+        .outerjoin(Programme, ExamResult.programme_id == Programme.id)
+        .order_by(ExamResult.id.desc())
+    )
+    return [ExamRow(*row) for row in query]
+
+
+# -------------------------
+# Enrollment
+# -------------------------
+EnrollmentRow = namedtuple("EnrollmentRow", "id programme_name year mode total")
+
+
+def enrollment_rows():
+    query = (
+        db.session.query(Enrollment.id, _programme_name(Enrollment),
+                         Enrollment.year, Enrollment.mode, head_count(Enrollment))
+        .outerjoin(Programme, Enrollment.programme_id == Programme.id)
+        .order_by(Enrollment.created_at.desc())
+    )
+    return [EnrollmentRow(*row) for row in query]
@@ -0,0 +1,181 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import g, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import CacheVersion, Department, Programme, Staff
+
+
+# -------------------------
+# DEPARTMENT / PROGRAMME LOOKUP BY NAME
+# -------------------------
+def normalize(text):
+    """Key used to match free-text names: case-insensitive, whitespace-collapsed."""
+    return " ".join((text or "").split()).casefold()
+
+
+class ReferenceIndex:
+    """Name → id lookups for departments (by name or code) and programmes."""
+
+    def __init__(self, departments, programmes):
+        self.departments = {}
+        for dept_id, name, code in departments:
+            for key in (normalize(name), normalize(code)):
+                if key:
+                    self.departments.setdefault(key, dept_id)
+
+        # The same programme name can exist in several departments
+        self.programmes = {}
+        for prog_id, dept_id, name in programmes:
+            self.programmes.setdefault(normalize(name), []).append((prog_id, dept_id))
+
+    @classmethod
+    def load(cls):
+        """The index of the current cached reference data."""
+        return reference_data().index
+
+    def department_id(self, name):
+        return self.departments.get(normalize(name))
+
+    def programme_id(self, name, department_id=None):
+        """Programme id for `name`, or None if unknown or ambiguous."""
+        matches = self.programmes.get(normalize(name), [])
+        if department_id is not None:
+            matches = [m for m in matches if m[1] == department_id]
+        return matches[0][0] if len(matches) == 1 else None
+
+    def resolve(self, department, programme):
+        """(department_id, programme_id) for a student's free-text pair."""
+        dept_id = self.department_id(department)
+        prog_id = self.programme_id(programme, dept_id)
+        if prog_id is not None and dept_id is None:
+            dept_id = next(d for p, d in self.programmes[normalize(programme)] if p == prog_id)
+        return dept_id, prog_id
+
+
+# =====================================================
+# REFERENCE-DATA CACHE (per worker)
+# =====================================================
+# Departments, programmes and the staff type / group lists are loaded once
+# per worker into immutable tuples and read-only dicts. Any flush that
+# writes to those tables bumps a version stamp in cache_version, in the
+# same transaction; every worker compares its copy against the stamp (once
+# per request) and reloads when it moved.
+CACHE_NAME = "reference"
+
+# Offered in the staff forms even before any staff record uses them
+DEFAULT_STAFF_TYPES = ("Teaching", "Non-Teaching", "Contractual", "Permanent")
+DEFAULT_STAFF_GROUPS = ("A", "B", "C", "D")
+
+DepartmentRef = namedtuple("DepartmentRef", [c.name for c in Department.__table__.c])
+
+
+class ProgrammeRef(namedtuple("ProgrammeRef", [c.name for c in Programme.__table__.c])):
+    __slots__ = ()
+
+    seats_total = Programme.seats_total
+
+
+class ReferenceData:
+    __slots__ = (
+        "version", "departments", "departments_by_id", "departments_by_code",
+        "programmes", "programmes_by_id", "programmes_by_department",
+        "staff_types", "staff_groups", "index",
+    )
+
+    def __init__(self, version, departments, programmes, staff_types, staff_groups):
+        self.version = version
+        self.departments = tuple(sorted(departments, key=lambda d: normalize(d.name)))
+        self.departments_by_id = MappingProxyType({d.id: d for d in self.departments})
+        self.departments_by_code = MappingProxyType(
+            {normalize(d.code): d for d in self.departments if d.code})
+
+        self.programmes = tuple(sorted(programmes, key=lambda p: (p.department_id, normalize(p.programme))))
+        self.programmes_by_id = MappingProxyType({p.id: p for p in self.programmes})
+        by_department = {}
+        for p in self.programmes:
+            by_department.setdefault(p.department_id, []).append(p)
+        self.programmes_by_department = MappingProxyType(
+            {dept_id: tuple(progs) for dept_id, progs in by_department.items()})
+
+        self.staff_types = _merge_choices(DEFAULT_STAFF_TYPES, staff_types)
+        self.staff_groups = _merge_choices(DEFAULT_STAFF_GROUPS, staff_groups)
+        self.index = ReferenceIndex(
+            [(d.id, d.name, d.code) for d in self.departments],
+            [(p.id, p.department_id, p.programme) for p in self.programmes],
+        )
+
+    def department_programmes(self, dept_id):
+        return self.programmes_by_department.get(dept_id, ())
+
+
+def _merge_choices(defaults, values):
+    extra = sorted({v.strip() for v in values if v and v.strip()} - set(defaults))
+    return tuple(defaults) + tuple(extra)
+
+
+_cached = None
+
+
+def _stored_version():
+    """Version stamp in the database, read at most once per request."""
+    if has_app_context() and "reference_version" in g:
+        return g.reference_version
+    version = db.session.query(CacheVersion.version).filter_by(name=CACHE_NAME).scalar() or 0
+    if has_app_context():
+        g.reference_version = version
+    return version
+
+
+def reference_data():
+    """The worker's ReferenceData, reloaded if another worker changed it."""
+    global _cached
+    # Called half-way through edits: don't flush the half-edited row early
+    with db.session.no_autoflush:
+        version = _stored_version()
+        if _cached is None or _cached.version != version:
+            _cached = ReferenceData(
+                version,
+                [DepartmentRef(*row) for row in db.session.query(*Department.__table__.c)],
+                [ProgrammeRef(*row) for row in db.session.query(*Programme.__table__.c)],
+                [t for (t,) in db.session.query(Staff.staff_type).distinct()],
+                [grp for (grp,) in db.session.query(Staff.group).distinct()],
+            )
+    return _cached
+
+
+# -------------------------
+# Invalidation
+# -------------------------
+STAFF_REFERENCE_COLUMNS = ("staff_type", "group")
+
+BUMP_SQL = (
+    "INSERT INTO cache_version (name, version) VALUES (?, 1) "
+    "ON CONFLICT (name) DO UPDATE SET version = version + 1"
+)
+
+
+def _touches_references(session):
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, (Department, Programme, Staff)):
+            return True
+    for obj in session.dirty:
+        if isinstance(obj, (Department, Programme)):
+            return True
+        if isinstance(obj, Staff) and any(
+                inspect(obj).attrs[c].history.has_changes() for c in STAFF_REFERENCE_COLUMNS):
+            return True
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_version(session, flush_context):
+    global _cached
+    if _touches_references(session):
+        session.connection().exec_driver_sql(BUMP_SQL, (CACHE_NAME,))
+        _cached = None
+        if has_app_context():
+            g.pop("reference_version", None)
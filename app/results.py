@@ -0,0 +1,431 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, insert, literal, select
+
+from . import audit, db
+from .admissions import CATEGORY_ALIASES
+from .archive import year_label
+from .models import AuditLog, ExamResult, Mark, Programme, Student, TermResult
+
+
+# =====================================================
+# STUDENT MARKS → RESULTS
+# =====================================================
+# Mark sheets (one row per student × course × term) are validated and
+# upserted into `mark` in bulk. Results are then computed a whole term at a
+# time on NumPy arrays: percentage → grade point per course, credit-weighted
+# sums per student (np.bincount) for SGPA, a cumulative pass over
+# term_result for CGPA, and one bincount over programme × category × gender
+# for the ExamResult rows, which are regenerated instead of typed in.
+GRADES = [
+    # (lowest percentage, letter, grade point) — UGC 10-point scale; F fails the course
+    (90, "O", 10),
+    (80, "A+", 9),
+    (70, "A", 8),
+    (60, "B+", 7),
+    (50, "B", 6),
+    (45, "C", 5),
+    (40, "P", 4),
+    (0, "F", 0),
+]
+DEFAULT_CREDITS = 4
+DEFAULT_MAX_MARKS = 100
+ABSENT = {"", "AB", "ABS", "ABSENT"}
+
+SHEET_COLUMNS = ("roll_no", "session", "semester", "course_code", "marks")   # credits, max_marks optional
+MARK_KEY = ["student_id", "session_year", "semester", "course_code"]
+AUDITED_FIELDS = MARK_KEY + ["programme_id", "credits", "max_marks", "marks"]
+MAX_ERRORS = 20
+
+# ExamResult count columns are <category>_<gender>, in this order
+EXAM_CATEGORIES = {"GEN": "general", "EWS": "ews", "SC": "sc", "ST": "st", "OBC": "obc"}
+EXAM_GENDERS = ["male", "female", "transgender"]
+GENDER_ALIASES = {"M": "MALE", "F": "FEMALE", "T": "TRANSGENDER", "OTHER": "TRANSGENDER"}
+
+# Ascending thresholds for np.searchsorted: index 0 = F, 1 = P, …, 7 = O
+_THRESHOLDS = np.array([g[0] for g in reversed(GRADES[:-1])], dtype=float)
+_POINTS = np.array([g[2] for g in reversed(GRADES)], dtype=float)
+_LETTERS = np.array([g[1] for g in reversed(GRADES)], dtype=object)
+
+UPDATE_MARK_SQL = "UPDATE mark SET credits = ?, max_marks = ?, marks = ? WHERE id = ?"
+INSERT_MARK_SQL = (
+    "INSERT INTO mark (student_id, programme_id, session_year, semester, course_code,"
+    " credits, max_marks, marks, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_TERM_SQL = (
+    "INSERT INTO term_result (student_id, session_year, semester, programme_id, credits,"
+    " credit_points, sgpa, failed_courses, passed, computed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+UPDATE_CGPA_SQL = "UPDATE term_result SET cgpa = ? WHERE student_id = ? AND session_year = ? AND semester = ?"
+
+
+class MarksError(Exception):
+    def __init__(self, errors, total=None):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+        self.total = total or len(errors)
+
+
+def grade_index(percent):
+    """Index into _POINTS / _LETTERS for each percentage (NaN = absent → F)."""
+    percent = np.asarray(percent, dtype=float)
+    return np.searchsorted(_THRESHOLDS, np.nan_to_num(percent, nan=-1.0), side="right")
+
+
+def grade(percent):
+    """(letter, grade point) for one percentage."""
+    i = int(grade_index([percent])[0])
+    return _LETTERS[i], int(_POINTS[i])
+
+
+def _upper(column):
+    return column.fillna("").astype(str).str.strip().str.upper()
+
+
+def _none(value):
+    return None if value != value else value   # NaN → NULL
+
+
+def _nullable(values):
+    return [_none(v) for v in values.tolist()]
+
+
+def _read(conn, query):
+    """
+    Run a Core select on the DB-API connection straight into a DataFrame,
+    skipping SQLAlchemy's per-row Row objects (10^5–10^6 rows here). Only
+    integer parameters are inlined.
+    """
+    sql = str(query.compile(conn, compile_kwargs={"literal_binds": True}))
+    return pd.read_sql_query(sql, conn.connection.dbapi_connection)
+
+
+def _term(model, session_year, semester, programme_id=None):
+    clause = and_(model.session_year == session_year, model.semester == semester)
+    return clause if programme_id is None else and_(clause, model.programme_id == programme_id)
+
+
+# -------------------------
+# Ingestion
+# -------------------------
+def read_sheet(source):
+    """CSV path or file object → frame of stripped strings, lower-case headers."""
+    try:
+        frame = pd.read_csv(source, dtype=str, keep_default_na=False)
+    except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+        raise MarksError([f"Not a readable CSV file: {e}"])
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+    return frame.apply(lambda column: column.str.strip())
+
+
+def _existing(conn, sheet):
+    columns = [getattr(Mark, c) for c in ["id"] + MARK_KEY + ["credits", "max_marks", "marks"]]
+    terms = sheet[["session_year", "semester"]].drop_duplicates().itertuples(index=False)
+    frame = pd.concat([_read(conn, select(*columns).where(_term(Mark, int(year), int(semester))))
+                       for year, semester in terms])
+    # Explicit dtypes: an empty result would otherwise not merge with the sheet
+    return frame.astype({
+        "id": "float64", "student_id": "int64", "session_year": "int64", "semester": "int64",
+        "credits": "float64", "max_marks": "float64", "marks": "float64",
+    })
+
+
+def _prepare(conn, frame):
+    """
+    Parse and check every row at once and line it up with the marks already
+    stored (columns <field>_old). Raises MarksError listing the bad lines.
+    """
+    missing = [c for c in SHEET_COLUMNS if c not in frame.columns]
+    if missing:
+        raise MarksError([f"Missing columns: {', '.join(missing)}"])
+    if frame.empty:
+        raise MarksError(["The mark sheet has no rows."])
+
+    students = _read(conn, select(Student.roll_no, Student.id.label("student_id"), Student.programme_id))
+    found = frame[["roll_no"]].merge(students.drop_duplicates("roll_no"), on="roll_no", how="left")
+    found.index = frame.index
+
+    def optional(name):
+        # NaN where not given: the stored value (or the default) is kept
+        if name not in frame.columns:
+            return pd.Series(np.nan, index=frame.index), pd.Series(False, index=frame.index)
+        return pd.to_numeric(frame[name], errors="coerce"), frame[name] != ""
+
+    credits, credits_given = optional("credits")
+    max_marks, max_given = optional("max_marks")
+    absent = frame["marks"].str.upper().isin(ABSENT)
+    sheet = pd.DataFrame({
+        "student_id": found["student_id"],
+        "programme_id": pd.to_numeric(found["programme_id"]),
+        "session_year": pd.to_numeric(frame["session"].str[:4], errors="coerce"),
+        "semester": pd.to_numeric(frame["semester"], errors="coerce"),
+        "course_code": frame["course_code"].str.upper(),
+        "credits": credits,
+        "max_marks": max_marks,
+        "marks": pd.to_numeric(frame["marks"].where(~absent), errors="coerce"),
+    })
+
+    # First problem per row wins
+    problems = pd.Series("", index=frame.index)
+
+    def flag(mask, message):
+        problems[mask & (problems == "")] = message
+
+    def report():
+        bad = problems.index[problems != ""]
+        if len(bad):
+            raise MarksError([f"line {i + 2}: {problems[i]}" for i in bad[:MAX_ERRORS]], len(bad))
+
+    flag(sheet["student_id"].isna(), "unknown roll number")
+    flag(sheet["session_year"].isna(), "session must look like 2024-25")
+    flag(~(sheet["semester"] >= 1) | (sheet["semester"] % 1 != 0), "semester must be 1, 2, …")
+    flag(sheet["course_code"] == "", "course_code is missing")
+    flag(credits_given & ~(sheet["credits"] > 0), "credits must be a positive number")
+    flag(max_given & (~(sheet["max_marks"] > 0) | (sheet["max_marks"] % 1 != 0)),
+         "max_marks must be a positive whole number")
+    flag(~absent & sheet["marks"].isna(), "marks must be a number or AB")
+    flag(sheet.duplicated(MARK_KEY, keep=False), "course listed twice for this student and term")
+    report()
+
+    sheet = sheet.astype({"student_id": "int64", "session_year": "int64", "semester": "int64"})
+    # Left merge on a unique key keeps the sheet's rows and order: line numbers still apply
+    merged = sheet.merge(_existing(conn, sheet), on=MARK_KEY, how="left", suffixes=("", "_old"))
+    merged.index = sheet.index
+    merged["credits"] = merged["credits"].fillna(merged["credits_old"]).fillna(DEFAULT_CREDITS)
+    merged["max_marks"] = merged["max_marks"].fillna(merged["max_marks_old"]).fillna(DEFAULT_MAX_MARKS)
+
+    flag(~absent & ~((merged["marks"] >= 0) & (merged["marks"] <= merged["max_marks"])),
+         "marks must be between 0 and max_marks")
+    report()
+    return merged.astype({"max_marks": "int64"})
+
+
+def load_marks(frame):
+    """
+    Validate a mark sheet and upsert it into `mark` (nothing is written if any
+    row is invalid). Unchanged rows are skipped. Does not commit.
+    Returns {"inserted", "updated", "unchanged", "terms": [(session_year, semester)]}.
+    """
+    conn = db.session.connection()
+    merged = _prepare(conn, frame)
+
+    new = merged["id"].isna()
+    same_marks = (merged["marks"] == merged["marks_old"]) | (merged["marks"].isna() & merged["marks_old"].isna())
+    changed = ~new & ((merged["credits"] != merged["credits_old"])
+                      | (merged["max_marks"] != merged["max_marks_old"]) | ~same_marks)
+
+    updates = merged[changed]
+    if len(updates):
+        conn.exec_driver_sql(UPDATE_MARK_SQL, list(zip(
+            updates["credits"].tolist(), updates["max_marks"].tolist(),
+            _nullable(updates["marks"]), updates["id"].astype("int64").tolist())))
+        diffs = {}
+        for row in updates.itertuples(index=False):
+            diffs[int(row.id)] = {
+                f: [_none(getattr(row, f + "_old")), _none(getattr(row, f))]
+                for f in ("credits", "max_marks", "marks")
+                if _none(getattr(row, f + "_old")) != _none(getattr(row, f))
+            }
+        audit.record_each("mark", "update", diffs)
+
+    inserts = merged[new]
+    if len(inserts):
+        before = conn.execute(select(db.func.coalesce(db.func.max(Mark.id), 0))).scalar()
+        now = datetime.utcnow().isoformat(" ")
+        conn.exec_driver_sql(INSERT_MARK_SQL, list(zip(
+            inserts["student_id"].tolist(), _nullable(inserts["programme_id"]),
+            inserts["session_year"].tolist(), inserts["semester"].tolist(),
+            inserts["course_code"].tolist(), inserts["credits"].tolist(),
+            inserts["max_marks"].tolist(), _nullable(inserts["marks"]), [now] * len(inserts))))
+        if audit.AUDIT_ENABLED:
+            # New rows are the ones above the old maximum id: one INSERT … SELECT
+            conn.execute(insert(AuditLog).from_select(
+                ["ts", "table_name", "row_id", "action", "changes"],
+                select(literal(datetime.utcnow()), literal("mark"), Mark.id, literal("insert"),
+                       db.func.json_object(*(x for c in AUDITED_FIELDS for x in (c, getattr(Mark, c)))))
+                .where(Mark.id > before),
+            ))
+
+    terms = sorted(map(tuple, merged[["session_year", "semester"]].drop_duplicates().to_numpy().tolist()))
+    return {"inserted": len(inserts), "updated": len(updates),
+            "unchanged": len(merged) - len(inserts) - len(updates), "terms": terms}
+
+
+def import_marks(frame):
+    """load_marks() plus a full recompute of every term it touched, in one transaction."""
+    try:
+        loaded = load_marks(frame)
+        loaded["results"] = [_compute(session_year, semester) for session_year, semester in loaded["terms"]]
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return loaded
+
+
+# -------------------------
+# Computation
+# -------------------------
+def _term_results(marks):
+    """Per-student arrays for one term from per-course arrays."""
+    index = grade_index(marks["marks"] / marks["max_marks"] * 100)
+    points = _POINTS[index]
+
+    students, first, inverse = np.unique(marks["student_id"], return_index=True, return_inverse=True)
+    credits = np.bincount(inverse, weights=marks["credits"])
+    credit_points = np.bincount(inverse, weights=marks["credits"] * points)
+    failed = np.bincount(inverse, weights=(index == 0).astype(float)).astype(np.int64)
+    sgpa = np.round(np.divide(credit_points, credits, out=np.full(len(credits), np.nan), where=credits > 0), 2)
+    return {
+        "student_id": students,
+        "programme_id": marks["programme_id"][first],
+        "credits": credits,
+        "credit_points": credit_points,
+        "sgpa": sgpa,
+        "failed": failed,
+        "passed": failed == 0,
+    }
+
+
+def _update_cgpa(conn, session_year, semester, programme_id):
+    """CGPA of this term and every later one, for the students in this term."""
+    in_term = select(TermResult.student_id).where(_term(TermResult, session_year, semester, programme_id))
+    frame = _read(conn, select(TermResult.student_id, TermResult.session_year, TermResult.semester,
+                               TermResult.credits, TermResult.credit_points)
+                  .where(TermResult.student_id.in_(in_term))
+                  .order_by(TermResult.student_id, TermResult.session_year, TermResult.semester))
+    totals = frame.groupby("student_id")[["credits", "credit_points"]].cumsum()
+    frame["cgpa"] = (totals["credit_points"] / totals["credits"]).round(2)
+
+    later = frame[(frame["session_year"] > session_year)
+                  | ((frame["session_year"] == session_year) & (frame["semester"] >= semester))]
+    if len(later):
+        conn.exec_driver_sql(UPDATE_CGPA_SQL, list(zip(
+            _nullable(later["cgpa"]), later["student_id"].tolist(),
+            later["session_year"].tolist(), later["semester"].tolist())))
+
+
+def _exam_counts(conn, session_year, semester, programme_id):
+    """{programme_id: (appeared, {count column: passed students})} and the unclassified count."""
+    frame = _read(conn, select(TermResult.programme_id, TermResult.passed, Student.category, Student.gender)
+                  .join(Student, Student.id == TermResult.student_id)
+                  .where(_term(TermResult, session_year, semester, programme_id),
+                         TermResult.programme_id.isnot(None)))
+
+    category = _upper(frame["category"]).replace(CATEGORY_ALIASES) \
+        .map({c: i for i, c in enumerate(EXAM_CATEGORIES)})
+    gender = _upper(frame["gender"]).replace(GENDER_ALIASES) \
+        .map({g.upper(): i for i, g in enumerate(EXAM_GENDERS)})
+    known = (category.notna() & gender.notna()).to_numpy()
+
+    programmes, index = np.unique(frame["programme_id"].to_numpy(dtype=np.int64), return_inverse=True)
+    width = len(EXAM_CATEGORIES) * len(EXAM_GENDERS)
+    appeared = np.bincount(index, minlength=len(programmes))
+    counted = known & frame["passed"].to_numpy(dtype=bool)
+    cells = (index[counted] * width
+             + category.to_numpy()[counted].astype(np.int64) * len(EXAM_GENDERS)
+             + gender.to_numpy()[counted].astype(np.int64))
+    counts = np.bincount(cells, minlength=len(programmes) * width).reshape(len(programmes), width)
+
+    names = [f"{prefix}_{g}" for prefix in EXAM_CATEGORIES.values() for g in EXAM_GENDERS]
+    return {
+        int(pid): (int(appeared[i]), dict(zip(names, counts[i].tolist())))
+        for i, pid in enumerate(programmes)
+    }, int((~known).sum())
+
+
+def _write_exam_results(counts, session_year, semester, programme_id):
+    # A handful of rows per term: through the ORM so they land in the audit log
+    query = ExamResult.query.filter(ExamResult.generated.is_(True), _term(ExamResult, session_year, semester,
+                                                                          programme_id))
+    existing = {r.programme_id: r for r in query}
+    names = dict(db.session.query(Programme.id, Programme.programme).filter(Programme.id.in_(list(counts))))
+    for pid, (appeared, cells) in counts.items():
+        row = existing.pop(pid, None)
+        if row is None:
+            row = ExamResult(generated=True, session_year=session_year, semester=semester, programme_id=pid)
+            db.session.add(row)
+        row.programme = names.get(pid) or f"Programme {pid}"
+        row.appeared = appeared
+        for name, n in cells.items():
+            setattr(row, name, n)
+    for row in existing.values():   # no students left with marks in this term
+        db.session.delete(row)
+
+
+def _compute(session_year, semester, programme_id=None):
+    start = time.perf_counter()
+    conn = db.session.connection()
+
+    frame = _read(conn, select(Mark.student_id, Mark.programme_id, Mark.credits, Mark.max_marks, Mark.marks)
+                  .where(_term(Mark, session_year, semester, programme_id)))
+    terms = _term_results({
+        "student_id": frame["student_id"].to_numpy(dtype=np.int64),
+        # NaN for students without a programme; stored as NULL
+        "programme_id": pd.to_numeric(frame["programme_id"]).to_numpy(dtype=float),
+        "credits": frame["credits"].to_numpy(dtype=float),
+        "max_marks": frame["max_marks"].to_numpy(dtype=float),
+        "marks": pd.to_numeric(frame["marks"]).to_numpy(dtype=float),
+    })
+
+    conn.execute(TermResult.__table__.delete().where(_term(TermResult, session_year, semester, programme_id)))
+    if len(terms["student_id"]):
+        now = datetime.utcnow().isoformat(" ")
+        programmes = [None if p != p else int(p) for p in terms["programme_id"].tolist()]
+        conn.exec_driver_sql(INSERT_TERM_SQL, list(zip(
+            terms["student_id"].tolist(), [session_year] * len(programmes), [semester] * len(programmes),
+            programmes, terms["credits"].tolist(), terms["credit_points"].tolist(),
+            _nullable(terms["sgpa"]), terms["failed"].tolist(), terms["passed"].tolist(),
+            [now] * len(programmes))))
+        _update_cgpa(conn, session_year, semester, programme_id)
+
+    counts, unclassified = _exam_counts(conn, session_year, semester, programme_id)
+    _write_exam_results(counts, session_year, semester, programme_id)
+
+    return {
+        "session": year_label(session_year),
+        "semester": semester,
+        "students": len(terms["student_id"]),
+        "passed": int(terms["passed"].sum()),
+        "programmes": len(counts),
+        # No category / gender on record: in `appeared`, not in the count columns
+        "unclassified": unclassified,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def compute(session_year, semester, programme_id=None):
+    """
+    Recompute term results (SGPA, CGPA, pass/fail) and the generated
+    ExamResult rows for one term, optionally one programme. Commits.
+    """
+    try:
+        result = _compute(session_year, semester, programme_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result
+
+
+# -------------------------
+# Querying
+# -------------------------
+def term_summaries():
+    """One row per (term, programme): students, passed, average SGPA."""
+    return (
+        db.session.query(
+            TermResult.session_year, TermResult.semester, TermResult.programme_id,
+            db.func.coalesce(Programme.programme, "—").label("programme_name"),
+            db.func.count().label("students"),
+            db.func.sum(db.cast(TermResult.passed, db.Integer)).label("passed"),
+            db.func.round(db.func.avg(TermResult.sgpa), 2).label("average_sgpa"),
+        )
+        .outerjoin(Programme, Programme.id == TermResult.programme_id)
+        .group_by(TermResult.session_year, TermResult.semester, TermResult.programme_id)
+        .order_by(TermResult.session_year.desc(), TermResult.semester.desc(), "programme_name")
+        .all()
+    )
@@ -0,0 +1,115 @@
+import hashlib
+import math
+from threading import Lock
+
+from . import db
+from .models import Student
+
+
+# -------------------------
+# ROLL NUMBER INDEX
+# -------------------------
+class RollIndex:
+    """
+    In-memory Bloom filter over Student.roll_no.
+
+    A miss means the roll number is definitely free (as far as this worker
+    knows), so add/edit can skip the database entirely. A hit is confirmed
+    with a single lookup on the unique roll_no index. Memory is fixed by
+    `capacity` and `error_rate`, not by the size of the student table.
+    """
+
+    def __init__(self, capacity=500_000, error_rate=0.001):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.warm = False
+        self._lock = Lock()
+
+    def _positions(self, roll_no):
+        digest = hashlib.blake2b(str(roll_no).strip().encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, roll_no):
+        if not roll_no:
+            return
+        for pos in self._positions(roll_no):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, roll_no):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(roll_no))
+
+    def warm_up(self, force=False):
+        """Load every existing roll number once per worker (streamed, not materialised)."""
+        with self._lock:
+            if self.warm and not force:
+                return
+            self.bits = bytearray(len(self.bits))
+            self.count = 0
+            for (roll_no,) in db.session.query(Student.roll_no).yield_per(5000):
+                self.add(roll_no)
+            self.warm = True
+
+    def exists(self, roll_no, exclude_id=None, trust_miss=True):
+        """
+        True if `roll_no` is taken by a student other than `exclude_id`.
+
+        Pass trust_miss=False when the answer is shown to a user: a miss is
+        then confirmed too, since other workers may have added the roll
+        number since this filter was warmed.
+        """
+        roll_no = (roll_no or "").strip()
+        if not roll_no:
+            return False
+        self.warm_up()
+        hit = self.might_contain(roll_no)
+        if not hit and trust_miss:
+            return False
+
+        q = db.session.query(Student.id).filter(Student.roll_no == roll_no)
+        if exclude_id is not None:
+            q = q.filter(Student.id != exclude_id)
+        taken = db.session.query(q.exists()).scalar()
+        if taken and not hit:
+            self.add(roll_no)
+        return taken
+
+    def validate_batch(self, roll_nos, chunk_size=500):
+        """
+        Check a whole import batch in one pass.
+
+        Returns (duplicates_in_batch, already_in_db). Only roll numbers the
+        filter flags are sent to the database, in chunked IN (...) queries.
+        """
+        self.warm_up()
+
+        seen = set()
+        in_batch = []
+        candidates = []
+        for roll_no in roll_nos:
+            roll_no = (roll_no or "").strip()
+            if not roll_no:
+                continue
+            if roll_no in seen:
+                in_batch.append(roll_no)
+                continue
+            seen.add(roll_no)
+            if self.might_contain(roll_no):
+                candidates.append(roll_no)
+
+        existing = []
+        for i in range(0, len(candidates), chunk_size):
+            chunk = candidates[i:i + chunk_size]
+            existing.extend(
+                r for (r,) in db.session.query(Student.roll_no).filter(Student.roll_no.in_(chunk))
+            )
+
+        return in_batch, sorted(existing)
+
+
+roll_index = RollIndex()
@@ -0,0 +1,140 @@
+from datetime import date, datetime
+
+from sqlalchemy import and_, insert, literal, select, update
+
+from . import audit, db
+from .archive import academic_year, year_label
+from .hostel_allocation import release_beds
+from .models import AuditLog, Programme, Rollover, Student
+from .scholarships import rebuild as rebuild_eligibility
+
+
+# =====================================================
+# ACADEMIC-YEAR ROLLOVER
+# =====================================================
+# At the end of a session every active student moves up one year, and
+# students already in the last year of their programme (Programme.
+# duration_years) graduate. Everything is done with a handful of set-based
+# statements in one transaction; the rollover table stops a session from
+# being rolled over twice.
+class RolloverError(Exception):
+    pass
+
+
+def _duration():
+    # Legacy rows store durations such as "2.0", hence the cast
+    return (
+        select(db.cast(Programme.duration_years, db.Integer))
+        .where(Programme.id == Student.programme_id)
+        .scalar_subquery()
+    )
+
+
+def _groups():
+    duration = _duration()
+    current = db.cast(Student.year, db.Integer)
+    active = and_(Student.graduated_year.is_(None), Student.year.isnot(None), duration > 0)
+    return {
+        "graduating": and_(active, current >= duration),
+        "promoting": and_(active, current < duration),
+    }
+
+
+def report(session_year):
+    """What a rollover of `session_year` would do, without changing anything."""
+    groups = _groups()
+    year = db.cast(Student.year, db.Integer)
+    promoting = dict(
+        db.session.query(year, db.func.count())
+        .filter(groups["promoting"])
+        .group_by(year)
+        .order_by(year)
+    )
+    graduating, with_beds = db.session.query(
+        db.func.count(), db.func.count(Student.hostel_id)
+    ).filter(groups["graduating"]).one()
+    active = Student.query.filter(Student.graduated_year.is_(None)).count()
+    return {
+        "session": year_label(session_year),
+        "promoted": promoting,
+        "graduated": graduating,
+        "vacated_beds": with_beds,
+        # No year, or no programme with a duration: left for manual review
+        "skipped": active - graduating - sum(promoting.values()),
+        "done": db.session.get(Rollover, session_year) is not None,
+    }
+
+
+def rollover(session_year, dry_run=False):
+    """
+    Promote and graduate every active student at the end of `session_year`.
+    Commits (unless dry_run) and returns the report.
+    """
+    if session_year >= academic_year(date.today()):
+        raise RolloverError(f"{year_label(session_year)} has not finished yet.")
+    result = report(session_year)
+    if result["done"]:
+        raise RolloverError(f"{result['session']} has already been rolled over.")
+    # Sessions roll over one after another: skipping or going back would
+    # promote students more than once for the same year of study
+    latest = db.session.query(db.func.max(Rollover.session_year)).scalar()
+    if latest is not None and session_year != latest + 1:
+        raise RolloverError(f"The last rollover was {year_label(latest)}; "
+                            f"the next one must be {year_label(latest + 1)}.")
+    if dry_run:
+        return result
+
+    groups = _groups()
+    try:
+        if audit.AUDIT_ENABLED:
+            _audit(groups, session_year)
+
+        beds = dict(
+            db.session.query(Student.hostel_id, db.func.count())
+            .filter(groups["graduating"], Student.hostel_id.isnot(None))
+            .group_by(Student.hostel_id)
+        )
+        # Graduate first: students promoted into their final year stay on
+        db.session.execute(
+            update(Student).where(groups["graduating"])
+            .values(graduated_year=session_year, hostel_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        release_beds(beds)
+        db.session.execute(
+            update(Student).where(groups["promoting"])
+            .values(year=db.cast(Student.year, db.Integer) + 1)
+            .execution_options(synchronize_session=False)
+        )
+        # Year and graduation feed the scholarship rules: one full vectorized pass
+        rebuild_eligibility(db.session.connection())
+        db.session.add(Rollover(
+            session_year=session_year,
+            promoted=sum(result["promoted"].values()),
+            graduated=result["graduated"],
+        ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire_all()
+    result["done"] = True
+    return result
+
+
+def _audit(groups, session_year):
+    # One INSERT … SELECT per group instead of a row per student in Python
+    ts = datetime.utcnow()
+    json_object, json_array = db.func.json_object, db.func.json_array
+    year = db.cast(Student.year, db.Integer)
+    changes = {
+        "graduating": json_object("graduated_year", json_array(None, session_year),
+                                  "hostel_id", json_array(Student.hostel_id, None)),
+        "promoting": json_object("year", json_array(year, year + 1)),
+    }
+    for name, changes_expr in changes.items():
+        db.session.execute(insert(AuditLog).from_select(
+            ["ts", "table_name", "row_id", "action", "changes"],
+            select(literal(ts), literal("student"), Student.id, literal("update"), changes_expr)
+            .where(groups[name]),
+        ))
@@ -0,0 +1,195 @@
+import sqlite3
+from collections import namedtuple
+from datetime import date, datetime
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from .models import Enrollment, MetricRollup, NSSEnrollment, Placement, Student
+from .read_models import count_columns
+
+
+# =====================================================
+# METRIC ROLLUPS — pre-aggregated chart series
+# =====================================================
+# metric_rollup keeps one counter per (metric, granularity, dimension,
+# bucket). Flushes add or subtract each changed row's contribution in the
+# same transaction, so charts read a few hundred counters instead of
+# scanning the source tables.
+Metric = namedtuple("Metric", "model date_column value_columns dimension_column")
+
+
+METRICS = {
+    # value_columns=() counts rows; otherwise the columns are summed
+    "admissions": Metric(Student, "created_at", (), None),
+    "enrollments": Metric(Enrollment, "created_at", tuple(c.name for c in count_columns(Enrollment)), None),
+    "placements": Metric(Placement, "date", (), None),
+    "nss_participation": Metric(NSSEnrollment, "date", ("male", "female"), "activity"),
+}
+
+# Bucket = ISO date prefix of this length
+GRANULARITIES = {"day": 10, "month": 7, "year": 4}
+
+UPSERT_SQL = (
+    "INSERT INTO metric_rollup (metric, granularity, dimension, bucket, value) "
+    "VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (metric, granularity, dimension, bucket) "
+    "DO UPDATE SET value = value + excluded.value"
+)
+
+_by_model = {}
+for _name, _metric in METRICS.items():
+    _by_model.setdefault(_metric.model, []).append((_name, _metric))
+    # Load the old value before an expired attribute is overwritten, so the
+    # previous contribution can be subtracted
+    for _column in filter(None, (_metric.date_column, _metric.dimension_column, *_metric.value_columns)):
+        event.listen(getattr(_metric.model, _column), "set", lambda *args: None, active_history=True)
+
+
+def _int(value):
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _contribution(metric, values):
+    """(day, dimension, value) a row with `values` adds to `metric`, or None."""
+    when = values.get(metric.date_column)
+    if isinstance(when, datetime):
+        when = when.date()
+    if not isinstance(when, date):
+        return None
+    value = sum(_int(values.get(c)) for c in metric.value_columns) if metric.value_columns else 1
+    dimension = str(values.get(metric.dimension_column) or "") if metric.dimension_column else ""
+    return when.isoformat(), dimension, value
+
+
+def _add(deltas, name, contribution, sign):
+    if contribution is None:
+        return
+    day, dimension, value = contribution
+    for granularity, length in GRANULARITIES.items():
+        key = (name, granularity, dimension, day[:length])
+        deltas[key] = deltas.get(key, 0) + sign * value
+
+
+def _collect(session):
+    deltas = {}
+    for objects, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            for name, metric in _by_model.get(type(obj), ()):
+                _add(deltas, name, _contribution(metric, inspect(obj).dict), sign)
+
+    for obj in session.dirty:
+        metrics = _by_model.get(type(obj))
+        if not metrics:
+            continue
+        state = inspect(obj)
+        for name, metric in metrics:
+            keys = (metric.date_column, metric.dimension_column, *metric.value_columns)
+            old, changed = {}, False
+            for key in filter(None, keys):
+                hist = state.attrs[key].history
+                changed = changed or hist.has_changes()
+                old[key] = hist.deleted[0] if hist.deleted else state.dict.get(key)
+            if changed:
+                _add(deltas, name, _contribution(metric, old), -1)
+                _add(deltas, name, _contribution(metric, state.dict), 1)
+
+    return [(*key, delta) for key, delta in deltas.items() if delta]
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    rows = _collect(session)
+    if rows:
+        session.connection().exec_driver_sql(UPSERT_SQL, rows)
+
+
+# -------------------------
+# Full rebuild (migration / CLI)
+# -------------------------
+def _group_sql(metric, length, table):
+    value = " + ".join(f'COALESCE("{c}", 0)' for c in metric.value_columns) or "1"
+    dimension = f'COALESCE("{metric.dimension_column}", \'\')' if metric.dimension_column else "''"
+    return (
+        f'SELECT {dimension}, substr("{metric.date_column}", 1, {length}), CAST(SUM({value}) AS INTEGER) '
+        f'FROM {table} WHERE "{metric.date_column}" IS NOT NULL GROUP BY 1, 2'
+    )
+
+
+def rebuild(conn):
+    """Recompute every rollup from the source tables and year archives with GROUP BY queries."""
+    conn.execute(text("DELETE FROM metric_rollup"))
+    for name, metric in METRICS.items():
+        for granularity, length in GRANULARITIES.items():
+            conn.execute(text(
+                "INSERT INTO metric_rollup (metric, granularity, dimension, bucket, value) "
+                "SELECT :metric, :granularity, * FROM ("
+                + _group_sql(metric, length, metric.model.__tablename__) + ")"
+            ), {"metric": name, "granularity": granularity})
+    _add_archived(conn)
+
+
+def _add_archived(conn):
+    # Rows moved out by archive-year still count in the charts. The archive
+    # files are read on their own connections: ATTACH can't run inside the
+    # caller's transaction.
+    from .archive import ARCHIVED_MODELS, archive_path, archived_years
+
+    for year in archived_years():
+        source = sqlite3.connect(f"file:{archive_path(year)}?mode=ro", uri=True)
+        try:
+            tables = {name for (name,) in source.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            rows = []
+            for name, metric in METRICS.items():
+                table = metric.model.__tablename__
+                if metric.model not in ARCHIVED_MODELS or table not in tables:
+                    continue
+                for granularity, length in GRANULARITIES.items():
+                    rows.extend((name, granularity, *group)
+                                for group in source.execute(_group_sql(metric, length, table)))
+        finally:
+            source.close()
+        if rows:
+            conn.exec_driver_sql(UPSERT_SQL, rows)
+
+
+# -------------------------
+# Querying
+# -------------------------
+def series(name, granularity="month", start=None, end=None, dimension=None):
+    """
+    ApexCharts series for `name`: one series per dimension value (or a single
+    series named after the metric), each a list of [bucket, value] points.
+    """
+    if name not in METRICS:
+        raise ValueError(f"Unknown metric '{name}'. Choose from: {', '.join(METRICS)}.")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}.")
+
+    length = GRANULARITIES[granularity]
+    query = MetricRollup.query.filter(
+        MetricRollup.metric == name,
+        MetricRollup.granularity == granularity,
+        MetricRollup.value != 0,
+    )
+    if start:
+        query = query.filter(MetricRollup.bucket >= start.isoformat()[:length])
+    if end:
+        query = query.filter(MetricRollup.bucket <= end.isoformat()[:length])
+    if dimension is not None:
+        query = query.filter(MetricRollup.dimension == dimension)
+
+    grouped = {}
+    rows = query.with_entities(MetricRollup.dimension, MetricRollup.bucket, MetricRollup.value) \
+        .order_by(MetricRollup.dimension, MetricRollup.bucket)
+    for dim, bucket, value in rows:
+        grouped.setdefault(dim, []).append([bucket, value])
+
+    return {
+        "metric": name,
+        "granularity": granularity,
+        "series": [{"name": dim or name, "data": data} for dim, data in grouped.items()],
+    }
@@ -1,49 +1,58 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response
+from datetime import date, timedelta
+
+from flask import Blueprint, Response, abort, render_template, request, redirect, url_for, flash, jsonify, send_file
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from . import db
 from .models import (
     Student, Hostel, Department, Programme,
     Enrollment, Placement, Staff, Scholarship,
     NSSEnrollment, ExamResult
 )
-
-from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
+from .roll_index import roll_index
+from .references import ReferenceIndex, reference_data
+from .hostel_allocation import AllocationError, allocate, vacate
+from .profiles import load_student_profile
+from .rollover import RolloverError, report as rollover_report, rollover
+from .results import MarksError, compute as compute_results, import_marks, read_sheet, term_summaries
+from .scholarships import eligible_students, parse_amount, split_list, summary as scholarship_summary
+from .audit import change_feed, change_head, history, record as record_change
+from .dates import parse_date, parse_year, date_range_args, filter_date_range
+from .pdf import render as render_pdf
+from . import analytics, archive, kpis, maintenance, photos, read_models, rollups
 
 main = Blueprint("main", __name__)
 
+# Choices shared by the student forms and the scholarship eligibility rules
+STUDENT_CATEGORIES = ["GEN", "EWS", "SC", "ST", "OBC"]
+STUDENT_GENDERS = ["Male", "Female", "Other"]
+
+
+def _pdf_response(pdf, filename):
+    # Stream the rendered file instead of copying it into a bytes object
+    size = pdf.seek(0, 2)
+    pdf.seek(0)
+    response = send_file(pdf, mimetype="application/pdf", as_attachment=True, download_name=filename)
+    response.content_length = size
+    return response
+
+
 # =====================================================
 # DASHBOARD
 # =====================================================
 @main.route("/")
 def dashboard():
-    enrollments = Enrollment.query.order_by(Enrollment.created_at.desc()).limit(5).all()
+    enrollments = (Enrollment.query.options(joinedload(Enrollment.prog), joinedload(Enrollment.student))
+                   .order_by(Enrollment.created_at.desc()).limit(5).all())
     students = Student.query.order_by(Student.created_at.desc()).limit(5).all()
 
-    labels = []
-    values = []
-    yearly_data = {}
-
-    for e in Enrollment.query.all():
-        if e.year not in yearly_data:
-            yearly_data[e.year] = 0
-        yearly_data[e.year] += (
-            (e.general_male or 0) + (e.general_female or 0) +
-            (e.ews_male or 0) + (e.ews_female or 0) +
-            (e.sc_male or 0) + (e.sc_female or 0) +
-            (e.st_male or 0) + (e.st_female or 0) +
-            (e.obc_male or 0) + (e.obc_female or 0) +
-            (e.trans_gender or 0)
-        )
-
-    for y in sorted(yearly_data):
-        labels.append(str(y))
-        values.append(yearly_data[y])
+    stats = kpis.get()
+    labels = [str(y) for y, _ in stats["enrollment_by_year"]]
+    values = [total for _, total in stats["enrollment_by_year"]]
 
     return render_template(
         "dashboard.html",
+        kpis=stats,
         enrollments=enrollments,
         students=students,
         enrollment_graph_labels=labels,
@@ -59,12 +68,12 @@ def students():
     search_query = request.args.get("search")
 
     if search_query:
-        students = Student.query.filter(
+        students = Student.query.options(joinedload(Student.prog)).filter(
             (Student.roll_no.ilike(f"%{search_query}%")) |
             (Student.name.ilike(f"%{search_query}%"))
         ).all()
     else:
-        students = Student.query.all()
+        students = Student.query.options(joinedload(Student.prog)).all()
 
     return render_template("students/students.html", students=students, search_query=search_query)
 
@@ -73,7 +82,7 @@ def students():
 @main.route("/students/add", methods=["GET", "POST"])
 def add_student():
     if request.method == "POST":
-        roll_no = request.form.get("roll_no")
+        roll_no = (request.form.get("roll_no") or "").strip()
         # if len(roll_no) > 11:
         #     return "Roll number cannot exceed 10 digits!"
         name = request.form.get("name")
@@ -82,54 +91,143 @@ def add_student():
             flash("Roll Number and Name are required!", "danger")
             return redirect(url_for("main.add_student"))
 
+        if roll_index.exists(roll_no):
+            flash(f"Roll Number {roll_no} already exists!", "danger")
+            return redirect(url_for("main.add_student"))
+
+        department_id, programme_id = ReferenceIndex.load().resolve(
+            request.form.get("department"), request.form.get("programme"))
+
         new_student = Student(
             roll_no=roll_no,
             name=name,
             email=request.form.get("email"),
             phone=request.form.get("phone"),
-            dob=request.form.get("dob"),
+            dob=parse_date(request.form.get("dob")),
             gender=request.form.get("gender"),
             address=request.form.get("address"),
             department=request.form.get("department"),
             programme=request.form.get("programme"),
+            department_id=department_id,
+            programme_id=programme_id,
             year=request.form.get("year"),
+            category=request.form.get("category") or None,
+            annual_income=request.form.get("annual_income", type=int),
             # bus=request.form.get("bus")
         )
         db.session.add(new_student)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker took the roll number after our check
+            db.session.rollback()
+            flash(f"Roll Number {roll_no} already exists!", "danger")
+            return redirect(url_for("main.add_student"))
+
+        roll_index.add(roll_no)
         flash("Student added successfully!", "success")
         return redirect(url_for("main.students"))
 
-    return render_template("students/add_student.html")
+    return render_template("students/add_student.html", categories=STUDENT_CATEGORIES)
+
+
+@main.route("/students/check-roll")
+def check_roll():
+    roll_no = (request.args.get("roll_no") or "").strip()
+    exclude_id = request.args.get("exclude", type=int)
+
+    # Other workers add students too: a filter miss is checked against the DB
+    taken = roll_index.exists(roll_no, exclude_id=exclude_id, trust_miss=False)
+    return jsonify({"roll_no": roll_no, "available": bool(roll_no) and not taken})
+
+
+LOOKUP_LIMIT = 25
+
+
+@main.route("/students/lookup")
+def student_lookup():
+    # Type-ahead: ?q=<prefix of roll no or name>&limit=10 → [[id, roll_no, name], ...]
+    # Both prefixes are range scans on the COLLATE NOCASE indexes, so the
+    # cost is O(limit) whatever the number of students.
+    q = " ".join((request.args.get("q") or "").split())
+    limit = max(1, min(request.args.get("limit", 10, type=int), LOOKUP_LIMIT))
+    if not q:
+        return jsonify([])
+
+    pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    matches = {}
+    for column in (Student.roll_no, Student.name):
+        rows = (
+            db.session.query(Student.id, Student.roll_no, Student.name)
+            .filter(column.like(pattern, escape="\\"))
+            .order_by(column.collate("NOCASE"))
+            .limit(limit)
+        )
+        for sid, roll_no, name in rows:
+            matches.setdefault(sid, [sid, roll_no, name])
+    return jsonify(list(matches.values())[:limit])
 
 
 @main.route("/student/<int:id>")
 def student_profile(id):
-    student = Student.query.get_or_404(id)
+    student = load_student_profile(id)
     return render_template("students/student_profile.html", student=student)
 
 
+@main.route("/student/<int:id>/photo", methods=["POST"])
+def upload_student_photo(id):
+    student = Student.query.get_or_404(id)
+    upload = request.files.get("photo")
+    try:
+        photos.submit(student.id, upload.read() if upload else b"")
+    except photos.PhotoError as e:
+        flash(str(e), "danger")
+    else:
+        flash("Photo uploaded — it appears once the resized copies are ready.", "success")
+    return redirect(url_for("main.student_profile", id=student.id))
+
+
 @main.route("/students/edit/<int:id>", methods=["GET", "POST"])
 def edit_student(id):
     student = Student.query.get_or_404(id)
 
     if request.method == "POST":
-        student.roll_no = request.form.get("roll_no")
+        # Stripped once: the duplicate check and the stored value must agree
+        roll_no = (request.form.get("roll_no") or "").strip()
+        if not roll_no:
+            flash("Roll Number is required!", "danger")
+            return redirect(url_for("main.edit_student", id=student.id))
+        if roll_index.exists(roll_no, exclude_id=student.id):
+            flash(f"Roll Number {roll_no} already exists!", "danger")
+            return redirect(url_for("main.edit_student", id=student.id))
+
+        student.roll_no = roll_no
         student.name = request.form.get("name")
         student.email = request.form.get("email")
         student.phone = request.form.get("phone")
-        student.dob = request.form.get("dob")
+        student.dob = parse_date(request.form.get("dob"))
         student.gender = request.form.get("gender")
         student.address = request.form.get("address")
         student.department = request.form.get("department")
         student.programme = request.form.get("programme")
+        student.department_id, student.programme_id = ReferenceIndex.load().resolve(
+            student.department, student.programme)
         student.year = request.form.get("year")
+        student.category = request.form.get("category") or None
+        student.annual_income = request.form.get("annual_income", type=int)
 
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash(f"Roll Number {roll_no} already exists!", "danger")
+            return redirect(url_for("main.edit_student", id=id))
+
+        roll_index.add(roll_no)
         flash("Student updated!", "info")
         return redirect(url_for("main.students"))
 
-    return render_template("students/edit_student.html", student=student)
+    return render_template("students/edit_student.html", student=student, categories=STUDENT_CATEGORIES)
 
 
 @main.route("/students/delete/<int:id>")
@@ -141,50 +239,36 @@ def delete_student(id):
     return redirect(url_for("main.students"))
 
 
+# ----------------------------------------------------
+# ACADEMIC-YEAR ROLLOVER (GET = dry run, POST = apply)
+# ----------------------------------------------------
+@main.route("/students/rollover", methods=["GET", "POST"])
+def student_rollover():
+    # Default: the session that finished last
+    session_year = (archive.parse_academic_year(request.values.get("session"))
+                    or archive.academic_year(date.today()) - 1)
+    try:
+        result = rollover(session_year, dry_run=request.method == "GET")
+    except RolloverError as e:
+        if request.method == "POST":
+            flash(str(e), "danger")
+            return redirect(url_for("main.student_rollover", session=session_year))
+        result = dict(rollover_report(session_year), error=str(e))
+
+    if request.method == "POST":
+        flash(f"{result['session']}: {sum(result['promoted'].values())} students promoted, "
+              f"{result['graduated']} graduated.", "success")
+        return redirect(url_for("main.students"))
+    return render_template("students/rollover.html", result=result, session_year=session_year)
+
+
 # ----------------------------------------------------
 # STUDENT PDF EXPORT
 # ----------------------------------------------------
 @main.route("/student/pdf/<int:id>")
 def student_pdf(id):
-    s = Student.query.get_or_404(id)
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Paragraph("<b>Student Profile</b>", styles["Title"]))
-    story.append(Spacer(1, 12))
-
-    fields = [
-        ["Roll No", s.roll_no],
-        ["Name", s.name],
-        ["Email", s.email],
-        ["Phone", s.phone],
-        ["DOB", s.dob],
-        ["Gender", s.gender],
-        ["Address", s.address],
-        ["Department", s.department],
-        ["Programme", s.programme],
-        ["Year", s.year]
-    ]
-
-    table = Table(fields, colWidths=[150, 300])
-    table.setStyle(TableStyle([
-        ("GRID", (0, 0), (-1, -1), 1, colors.grey),
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey)
-    ]))
-    story.append(table)
-
-    doc.build(story)
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    response = make_response(pdf)
-    response.headers["Content-Type"] = "application/pdf"
-    response.headers["Content-Disposition"] = f"attachment; filename=student_{s.id}.pdf"
-    return response
+    s = load_student_profile(id)
+    return _pdf_response(render_pdf("student", s), f"student_{s.id}.pdf")
 
 
 # =====================================================
@@ -192,24 +276,28 @@ def student_pdf(id):
 # =====================================================
 @main.route("/enrollment", methods=["GET", "POST"])
 def enrollment():
-    students = Student.query.all()
-
     if request.method == "POST":
-        student_id = request.form.get("student_id")
+        student_id = request.form.get("student_id") or "none"
+        std = Student.query.get(student_id) if student_id != "none" else None
+        if student_id != "none" and std is None:
+            flash("Selected student no longer exists.", "danger")
+            return redirect(url_for("main.enrollment"))
 
-        if student_id != "none":
-            std = Student.query.get(student_id)
+        if std is not None:
             programme = std.programme
+            programme_id = std.programme_id
             year = std.year
             mode = "Regular"
         else:
             programme = request.form["programme"]
+            programme_id = ReferenceIndex.load().programme_id(programme)
             year = request.form["year"]
             mode = request.form["mode"]
 
         record = Enrollment(
             student_id=student_id if student_id != "none" else None,
             programme=programme,
+            programme_id=programme_id,
             year=year,
             mode=mode,
             general_male=request.form.get("general_male") or 0,
@@ -230,8 +318,7 @@ def enrollment():
         flash("Enrollment saved!", "success")
         return redirect(url_for("main.enrollment"))
 
-    enrollments = Enrollment.query.order_by(Enrollment.created_at.desc()).all()
-    return render_template("enrollment/enrollment.html", students=students, enrollments=enrollments)
+    return render_template("enrollment/enrollment.html", enrollments=read_models.enrollment_rows())
 
 
 @main.route("/enrollment/edit/<int:id>", methods=["GET", "POST"])
@@ -240,6 +327,7 @@ def edit_enrollment(id):
 
     if request.method == "POST":
         e.programme = request.form["programme"]
+        e.programme_id = ReferenceIndex.load().programme_id(e.programme)
         e.year = request.form["year"]
         e.mode = request.form["mode"]
 
@@ -283,69 +371,16 @@ def delete_enrollment(id):
 @main.route("/enrollment/pdf/<int:id>")
 def enrollment_pdf(id):
     e = Enrollment.query.get_or_404(id)
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Paragraph("<b>Enrollment Report</b>", styles["Title"]))
-    story.append(Spacer(1, 12))
-
-    story.append(Paragraph(f"<b>Programme:</b> {e.programme}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Year:</b> {e.year}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Mode:</b> {e.mode}", styles["Normal"]))
-    story.append(Spacer(1, 12))
-
-    if e.student:
-        story.append(Paragraph("<b>Linked Student</b>", styles["Heading3"]))
-        story.append(Paragraph(f"Name: {e.student.name}", styles["Normal"]))
-        story.append(Paragraph(f"Roll No: {e.student.roll_no}", styles["Normal"]))
-        story.append(Spacer(1, 12))
-
-    table_data = [
-        ["Category", "Count"],
-        ["General Male", e.general_male],
-        ["General Female", e.general_female],
-        ["EWS Male", e.ews_male],
-        ["EWS Female", e.ews_female],
-        ["SC Male", e.sc_male],
-        ["SC Female", e.sc_female],
-        ["ST Male", e.st_male],
-        ["ST Female", e.st_female],
-        ["OBC Male", e.obc_male],
-        ["OBC Female", e.obc_female],
-        ["Transgender", e.trans_gender]
-    ]
-
-    table = Table(table_data, colWidths=[200, 100])
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("GRID", (0, 0), (-1, -1), 1, colors.grey)
-    ]))
-    story.append(table)
-
-    doc.build(story)
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    response = make_response(pdf)
-    response.headers["Content-Type"] = "application/pdf"
-    response.headers["Content-Disposition"] = f"attachment; filename=enrollment_{e.id}.pdf"
-    return response
+    return _pdf_response(render_pdf("enrollment", e), f"enrollment_{e.id}.pdf")
 
 
 # =====================================================
 # STAFF MODULE (SIMPLE VERSION – matches your templates)
 # =====================================================
-ROLES = ["Admin", "Teacher", "Librarian", "Accountant", "Staff"]
-
 @main.route("/staff")
 def staff_list():
-    staff_list = Staff.query.order_by(Staff.name.asc()).all()
-
-    total_sanctioned = sum((s.sanctioned_strength or 0) for s in staff_list)
-    total_staff_count = sum((s.total_strength() or 0) for s in staff_list)
+    staff_list = read_models.staff_rows()
+    total_sanctioned, total_staff_count = read_models.staff_totals()
 
     return render_template(
         "staff/staff_list.html",
@@ -355,9 +390,6 @@ def staff_list():
     )
 
 
-
-STAFF_GROUPS = ["A", "B", "C", "D"]
-STAFF_TYPES = ["Permanent", "Contractual", "Teaching", "Non-Teaching"]
 @main.route("/staff/add", methods=["GET", "POST"])
 def add_staff():
     if request.method == "POST":
@@ -388,7 +420,9 @@ def add_staff():
         flash("Staff added successfully!", "success")
         return redirect(url_for("main.staff_list"))
 
-    return render_template("staff/add_staff.html", STAFF_TYPES=STAFF_TYPES, STAFF_GROUPS=STAFF_GROUPS)
+    refs = reference_data()
+    return render_template("staff/add_staff.html",
+                           staff_types=refs.staff_types, staff_groups=refs.staff_groups)
 
 
 @main.route("/staff/edit/<int:staff_id>", methods=["GET", "POST"])
@@ -397,15 +431,21 @@ def edit_staff(staff_id):
 
     if request.method == "POST":
         staff.name = request.form.get("name")
-        staff.type = request.form.get("type")
-        staff.position = request.form.get("position")
-        staff.category = request.form.get("category")
+        staff.staff_type = request.form.get("staff_type")
+        staff.group = request.form.get("group")
+        staff.sanctioned_strength = request.form.get("sanctioned_strength") or 0
+        for cat in ("general", "ews", "sc", "st", "obc"):
+            for gender in ("male", "female", "transgender"):
+                field = f"{cat}_{gender}"
+                setattr(staff, field, request.form.get(field) or 0)
 
         db.session.commit()
         flash("Staff updated!", "info")
         return redirect(url_for("main.staff_list"))
 
-    return render_template("staff/edit_staff.html", staff=staff, roles=ROLES)
+    refs = reference_data()
+    return render_template("staff/edit_staff.html", staff=staff,
+                           staff_types=refs.staff_types, staff_groups=refs.staff_groups)
 
 
 @main.route("/staff/profile/<int:staff_id>")
@@ -433,37 +473,7 @@ def delete_staff(staff_id):
 @main.route("/staff/pdf/<int:id>")
 def staff_pdf(id):
     s = Staff.query.get_or_404(id)
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Paragraph("<b>Staff ID Card</b>", styles["Title"]))
-    story.append(Spacer(1, 12))
-
-    fields = [
-        ["Name", s.name],
-        ["Type", s.type],
-        ["Position", s.position],
-        ["Category", s.category]
-    ]
-
-    table = Table(fields, colWidths=[150, 300])
-    table.setStyle(TableStyle([
-        ("GRID", (0, 0), (-1, -1), 1, colors.grey),
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey)
-    ]))
-    story.append(table)
-
-    doc.build(story)
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    response = make_response(pdf)
-    response.headers["Content-Type"] = "application/pdf"
-    response.headers["Content-Disposition"] = f"attachment; filename=staff_{s.id}.pdf"
-    return response
+    return _pdf_response(render_pdf("staff", s), f"staff_{s.id}.pdf")
 
 
 # =====================================================
@@ -471,8 +481,7 @@ def staff_pdf(id):
 # =====================================================
 @main.route("/departments")
 def departments():
-    depts = Department.query.order_by(Department.name.asc()).all()
-    return render_template("departments/departments.html", departments=depts)
+    return render_template("departments/departments.html", departments=reference_data().departments)
 
 
 @main.route("/departments/add", methods=["GET", "POST"])
@@ -520,68 +529,25 @@ def delete_department(dept_id):
 
 @main.route("/departments/<int:dept_id>")
 def department_profile(dept_id):
-    dept = Department.query.get_or_404(dept_id)
-    programmes = Programme.query.filter_by(department_id=dept.id).order_by(Programme.programme.asc()).all()
+    refs = reference_data()
+    dept = refs.departments_by_id.get(dept_id) or abort(404)
+    programmes = refs.department_programmes(dept_id)
     return render_template("departments/department_profile.html", department=dept, programmes=programmes)
 
 
 @main.route("/departments/pdf/<int:dept_id>")
 def department_pdf(dept_id):
-    dept = Department.query.get_or_404(dept_id)
-    programmes = Programme.query.filter_by(department_id=dept.id).all()
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Paragraph(f"<b>Department Report — {dept.name}</b>", styles["Title"]))
-    if dept.code:
-        story.append(Paragraph(f"Code: {dept.code}", styles["Normal"]))
-    if dept.hod:
-        story.append(Paragraph(f"HOD: {dept.hod}", styles["Normal"]))
-    story.append(Spacer(1, 12))
-
-    data = [
-        ["Programme", "Level", "Year start", "Duration (Y/M)", "Exam", "Approved By",
-         "Gen", "SC", "ST", "OBC", "EWS", "Super", "Total"]
-    ]
-
-    for p in programmes:
-        data.append([
-            p.programme,
-            p.level or "-",
-            p.year_of_start or "-",
-            f"{p.duration_years or '-'} / {p.duration_months or '-'}",
-            p.exam_system or "-",
-            p.approved_by or "-",
-            p.seats_general or 0,
-            p.seats_sc or 0,
-            p.seats_st or 0,
-            p.seats_obc or 0,
-            p.seats_ews or 0,
-            p.seats_supernumerary or 0,
-            p.seats_total()
-        ])
-
-    table = Table(data, colWidths=[120, 40, 45, 70, 50, 80, 30, 30, 30, 30, 30, 45, 40])
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("ALIGN", (6, 1), (-1, -1), "CENTER")
-    ]))
-
-    story.append(table)
-    doc.build(story)
-
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    response = make_response(pdf)
-    response.headers["Content-Type"] = "application/pdf"
-    response.headers["Content-Disposition"] = f"attachment; filename=department_{dept.id}.pdf"
-    return response
+    refs = reference_data()
+    dept = refs.departments_by_id.get(dept_id) or abort(404)
+    programmes = refs.department_programmes(dept_id)
+    return _pdf_response(render_pdf("department", (dept, programmes)), f"department_{dept.id}.pdf")
+
+
+# University-wide report: one section per department, rendered in parallel chunks
+@main.route("/departments/pdf/all")
+def all_departments_pdf():
+    refs = reference_data()
+    return _pdf_response(render_pdf("departments", (refs.departments, refs.programmes)), "departments.pdf")
 
 
 # =====================================================
@@ -589,21 +555,22 @@ def department_pdf(dept_id):
 # =====================================================
 @main.route("/departments/<int:dept_id>/programmes")
 def programmes(dept_id):
-    dept = Department.query.get_or_404(dept_id)
-    programmes = Programme.query.filter_by(department_id=dept_id).all()
+    refs = reference_data()
+    dept = refs.departments_by_id.get(dept_id) or abort(404)
+    programmes = refs.department_programmes(dept_id)
     return render_template("departments/programmes.html", department=dept, programmes=programmes)
 
 
 @main.route("/departments/<int:dept_id>/programmes/add", methods=["GET", "POST"])
 def add_programme(dept_id):
-    dept = Department.query.get_or_404(dept_id)
+    dept = reference_data().departments_by_id.get(dept_id) or abort(404)
 
     if request.method == "POST":
         p = Programme(
             department_id=dept_id,
             programme=request.form.get("programme"),
             level=request.form.get("level"),
-            year_of_start=request.form.get("year_of_start"),
+            year_of_start=parse_year(request.form.get("year_of_start")),
             admission_criteria=request.form.get("admission_criteria"),
             duration_years=request.form.get("duration_years"),
             duration_months=request.form.get("duration_months"),
@@ -628,12 +595,12 @@ def add_programme(dept_id):
 @main.route("/programmes/edit/<int:prog_id>", methods=["GET", "POST"])
 def edit_programme(prog_id):
     p = Programme.query.get_or_404(prog_id)
-    dept = Department.query.get_or_404(p.department_id)
+    dept = reference_data().departments_by_id.get(p.department_id) or abort(404)
 
     if request.method == "POST":
         p.programme = request.form.get("programme")
         p.level = request.form.get("level")
-        p.year_of_start = request.form.get("year_of_start")
+        p.year_of_start = parse_year(request.form.get("year_of_start"))
         p.admission_criteria = request.form.get("admission_criteria")
         p.duration_years = request.form.get("duration_years")
         p.duration_months = request.form.get("duration_months")
@@ -686,7 +653,7 @@ def add_hostel():
             name=name,
             type=request.form.get("type"),
             capacity=int(request.form.get("capacity") or 0),
-            students_residing=int(request.form.get("students_residing") or 0),
+            students_residing=0,
             # warden only if your model has this column
             warden=request.form.get("warden") if hasattr(Hostel, "warden") else None
         )
@@ -703,10 +670,14 @@ def edit_hostel(hostel_id):
     h = Hostel.query.get_or_404(hostel_id)
 
     if request.method == "POST":
+        capacity = int(request.form.get("capacity") or 0)
+        if capacity < (h.students_residing or 0):
+            flash(f"Capacity cannot be below the {h.students_residing} students residing.", "danger")
+            return redirect(url_for("main.edit_hostel", hostel_id=h.id))
+
         h.name = request.form.get("name")
         h.type = request.form.get("type")
-        h.capacity = int(request.form.get("capacity") or 0)
-        h.students_residing = int(request.form.get("students_residing") or 0)
+        h.capacity = capacity
         if hasattr(Hostel, "warden"):
             h.warden = request.form.get("warden")
 
@@ -720,6 +691,9 @@ def edit_hostel(hostel_id):
 @main.route("/hostels/delete/<int:hostel_id>", methods=["POST"])
 def delete_hostel(hostel_id):
     h = Hostel.query.get_or_404(hostel_id)
+    resident_ids = [sid for (sid,) in db.session.query(Student.id).filter_by(hostel_id=h.id)]
+    Student.query.filter_by(hostel_id=h.id).update({"hostel_id": None}, synchronize_session=False)
+    record_change("student", resident_ids, "update", {"hostel_id": [h.id, None]})
     db.session.delete(h)
     db.session.commit()
     flash("Hostel deleted!", "danger")
@@ -729,55 +703,41 @@ def delete_hostel(hostel_id):
 @main.route("/hostels/<int:hostel_id>")
 def hostel_profile(hostel_id):
     h = Hostel.query.get_or_404(hostel_id)
-    return render_template("hostels/hostel_profile.html", hostel=h)
+    # programme_name reads Student.prog: load it with the residents, not per row
+    residents = (h.residents.options(joinedload(Student.prog))
+                 .order_by(Student.roll_no.asc()).limit(500).all())
+    return render_template("hostels/hostel_profile.html", hostel=h, residents=residents)
+
+
+@main.route("/hostels/<int:hostel_id>/allocate", methods=["POST"])
+def allocate_hostel(hostel_id):
+    h = Hostel.query.get_or_404(hostel_id)
+    roll_no = (request.form.get("roll_no") or "").strip()
+    student = Student.query.filter_by(roll_no=roll_no).first()
+
+    if not student:
+        flash(f"No student with Roll Number {roll_no}", "danger")
+    else:
+        try:
+            allocate(student, h)
+            flash(f"{student.name} allocated to {h.name}!", "success")
+        except AllocationError as e:
+            flash(str(e), "danger")
+    return redirect(url_for("main.hostel_profile", hostel_id=hostel_id))
+
+
+@main.route("/hostels/<int:hostel_id>/vacate/<int:student_id>", methods=["POST"])
+def vacate_hostel(hostel_id, student_id):
+    student = Student.query.filter_by(id=student_id, hostel_id=hostel_id).first_or_404()
+    vacate(student)
+    flash(f"{student.name} vacated.", "info")
+    return redirect(url_for("main.hostel_profile", hostel_id=hostel_id))
 
 
 @main.route("/hostels/pdf/<int:hostel_id>")
 def hostel_pdf(hostel_id):
     h = Hostel.query.get_or_404(hostel_id)
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Paragraph(f"<b>Hostel Report — {h.name}</b>", styles["Title"]))
-    story.append(Spacer(1, 8))
-
-    story.append(Paragraph(f"<b>Name:</b> {h.name}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Type:</b> {getattr(h, 'type', '-') or '-'}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Capacity:</b> {h.capacity}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Students Residing:</b> {h.students_residing}", styles["Normal"]))
-    if hasattr(h, "warden"):
-        story.append(Paragraph(f"<b>Warden:</b> {h.warden or '-'}", styles["Normal"]))
-    story.append(Spacer(1, 12))
-
-    data = [["Field", "Value"],
-            ["Name", h.name],
-            ["Type", getattr(h, "type", "-") or "-"],
-            ["Capacity", str(h.capacity)],
-            ["Students Residing", str(h.students_residing)]]
-
-    if hasattr(h, "warden"):
-        data.append(["Warden", h.warden or "-"])
-
-    data.append(["Created At", h.created_at.strftime("%d %b %Y")])
-
-    table = Table(data, colWidths=[200, 260])
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("GRID", (0, 0), (-1, -1), 1, colors.grey),
-        ("ALIGN", (0, 0), (-1, -1), "LEFT")
-    ]))
-    story.append(table)
-    doc.build(story)
-
-    pdf = buffer.getvalue()
-    buffer.close()
-    response = make_response(pdf)
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename=hostel_{h.id}.pdf'
-    return response
+    return _pdf_response(render_pdf("hostel", h), f"hostel_{h.id}.pdf")
 
 
 # =====================================================
@@ -785,8 +745,14 @@ def hostel_pdf(hostel_id):
 # =====================================================
 @main.route("/placement")
 def placement():
-    placements = Placement.query.order_by(Placement.id.desc()).all()
-    return render_template("placement/placement.html", placements=placements)
+    date_from, date_to = date_range_args(request.args)
+    query = filter_date_range(Placement.query, Placement.date, date_from, date_to)
+    placements = query.order_by(Placement.id.desc()).all()
+    # Archived sessions are only read when the range reaches back into them
+    placements += sorted(archive.archived_rows(Placement, date_from, date_to),
+                         key=lambda p: p.date, reverse=True)
+    return render_template("placement/placement.html", placements=placements,
+                           date_from=date_from, date_to=date_to)
 
 
 @main.route("/placement/add", methods=["GET", "POST"])
@@ -795,7 +761,7 @@ def add_placement():
         p = Placement(
             company=request.form["company"],
             role=request.form.get("role"),
-            date=request.form.get("date"),
+            date=parse_date(request.form.get("date")),
             details=request.form.get("details")
         )
         db.session.add(p)
@@ -813,7 +779,7 @@ def edit_placement(placement_id):
     if request.method == "POST":
         p.company = request.form["company"]
         p.role = request.form.get("role")
-        p.date = request.form.get("date")
+        p.date = parse_date(request.form.get("date"))
         p.details = request.form.get("details")
 
         db.session.commit()
@@ -841,56 +807,61 @@ def placement_profile(id):
 @main.route("/placement/pdf/<int:id>")
 def placement_pdf(id):
     p = Placement.query.get_or_404(id)
+    return _pdf_response(render_pdf("placement", p), f"placement_{p.id}.pdf")
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
 
-    story = []
-    story.append(Paragraph("<b>Placement Report</b>", styles["Title"]))
-    story.append(Spacer(1, 12))
+# =====================================================
+# SCHOLARSHIP MODULE
+# =====================================================
+ELIGIBLE_LIST_LIMIT = 500
 
-    story.append(Paragraph(f"<b>Company:</b> {p.company}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Role:</b> {p.role}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Date:</b> {p.date}", styles["Normal"]))
-    story.append(Spacer(1, 12))
-    story.append(Paragraph("<b>Details:</b>", styles["Heading2"]))
-    story.append(Paragraph(p.details or "No details provided.", styles["Normal"]))
 
-    doc.build(story)
+def _fill_scholarship(s, form):
+    s.title = form.get("title")
+    s.amount = parse_amount(form.get("amount"))
+    s.criteria = form.get("criteria")
+    s.programme_id = form.get("programme_id", type=int)
+    s.year_min = form.get("year_min", type=int)
+    s.year_max = form.get("year_max", type=int)
+    s.categories = ",".join(form.getlist("categories")) or None
+    s.genders = ",".join(form.getlist("genders")) or None
+    s.income_min = form.get("income_min", type=int)
+    s.income_max = form.get("income_max", type=int)
 
-    pdf = buffer.getvalue()
-    buffer.close()
 
-    response = make_response(pdf)
-    response.headers["Content-Type"] = "application/pdf"
-    response.headers["Content-Disposition"] = f"attachment; filename=placement_{p.id}.pdf"
-    return response
+def _scholarship_form(template, **context):
+    return render_template(template, programmes=reference_data().programmes,
+                           categories=STUDENT_CATEGORIES, genders=STUDENT_GENDERS,
+                           split_list=split_list, **context)
 
 
-# =====================================================
-# SCHOLARSHIP MODULE
-# =====================================================
 @main.route("/scholarship")
 def scholarship():
     scholarships = Scholarship.query.order_by(Scholarship.id.desc()).all()
-    return render_template("scholarship/scholarship.html", scholarships=scholarships)
+    return render_template("scholarship/scholarship.html", scholarships=scholarships,
+                           totals=scholarship_summary())
+
+
+@main.route("/scholarship/<int:scholarship_id>/eligible")
+def scholarship_eligible(scholarship_id):
+    s = Scholarship.query.get_or_404(scholarship_id)
+    count, outlay = scholarship_summary().get(s.id, (0, 0))
+    students = eligible_students(s.id, limit=ELIGIBLE_LIST_LIMIT)
+    return render_template("scholarship/eligible.html", scholarship=s, students=students,
+                           count=count, outlay=outlay)
 
 
 @main.route("/scholarship/add", methods=["GET", "POST"])
 def add_scholarship():
     if request.method == "POST":
-        s = Scholarship(
-            title=request.form.get("title"),
-            amount=request.form.get("amount"),
-            criteria=request.form.get("criteria")
-        )
+        s = Scholarship()
+        _fill_scholarship(s, request.form)
         db.session.add(s)
         db.session.commit()
         flash("Scholarship added!", "success")
         return redirect(url_for("main.scholarship"))
 
-    return render_template("scholarship/add_scholarship.html")
+    return _scholarship_form("scholarship/add_scholarship.html")
 
 
 @main.route("/scholarship/edit/<int:scholarship_id>", methods=["GET", "POST"])
@@ -898,15 +869,13 @@ def edit_scholarship(scholarship_id):
     s = Scholarship.query.get_or_404(scholarship_id)
 
     if request.method == "POST":
-        s.title = request.form.get("title")
-        s.amount = request.form.get("amount")
-        s.criteria = request.form.get("criteria")
+        _fill_scholarship(s, request.form)
 
         db.session.commit()
         flash("Scholarship updated!", "info")
         return redirect(url_for("main.scholarship"))
 
-    return render_template("scholarship/edit_scholarship.html", scholarship=s)
+    return _scholarship_form("scholarship/edit_scholarship.html", scholarship=s)
 
 
 @main.route("/scholarship/delete/<int:scholarship_id>", methods=["POST"])
@@ -923,8 +892,12 @@ def delete_scholarship(scholarship_id):
 # =====================================================
 @main.route("/nss")
 def nss_list():
-    nss = NSSEnrollment.query.order_by(NSSEnrollment.id.desc()).all()
-    return render_template("nss/nss.html", nss_list=nss)
+    date_from, date_to = date_range_args(request.args)
+    query = filter_date_range(NSSEnrollment.query, NSSEnrollment.date, date_from, date_to)
+    nss = query.order_by(NSSEnrollment.id.desc()).all()
+    nss += sorted(archive.archived_rows(NSSEnrollment, date_from, date_to),
+                  key=lambda n: n.date, reverse=True)
+    return render_template("nss/nss.html", nss_list=nss, date_from=date_from, date_to=date_to)
 
 
 @main.route("/nss/add", methods=["GET", "POST"])
@@ -932,7 +905,7 @@ def add_nss():
     if request.method == "POST":
         entry = NSSEnrollment(
             activity=request.form.get("activity"),
-            date=request.form.get("date"),
+            date=parse_date(request.form.get("date")),
             male=int(request.form.get("male") or 0),
             female=int(request.form.get("female") or 0),
             remarks=request.form.get("remarks")
@@ -951,7 +924,7 @@ def edit_nss(nss_id):
 
     if request.method == "POST":
         entry.activity = request.form.get("activity")
-        entry.date = request.form.get("date")
+        entry.date = parse_date(request.form.get("date"))
         entry.male = int(request.form.get("male") or 0)
         entry.female = int(request.form.get("female") or 0)
         entry.remarks = request.form.get("remarks")
@@ -977,15 +950,16 @@ def delete_nss(nss_id):
 # ==========================================================
 @main.route("/exam")
 def exam_results():
-    results = ExamResult.query.order_by(ExamResult.id.desc()).all()
-    return render_template("exam/exam_results.html", results=results)
+    return render_template("exam/exam_results.html", results=read_models.exam_rows())
 
 
 @main.route("/exam/add", methods=["GET", "POST"])
 def add_exam_result():
     if request.method == "POST":
+        programme = request.form.get("programme")
         result = ExamResult(
-            programme=request.form.get("programme"),
+            programme=programme,
+            programme_id=ReferenceIndex.load().programme_id(programme),
             general_male=request.form.get("general_male") or 0,
             general_female=request.form.get("general_female") or 0,
             general_transgender=request.form.get("general_transgender") or 0,
@@ -1017,6 +991,7 @@ def edit_exam_result(exam_id):
 
     if request.method == "POST":
         result.programme = request.form.get("programme")
+        result.programme_id = ReferenceIndex.load().programme_id(result.programme)
         result.general_male = request.form.get("general_male") or 0
         result.general_female = request.form.get("general_female") or 0
         result.general_transgender = request.form.get("general_transgender") or 0
@@ -1056,46 +1031,172 @@ def delete_exam_result(exam_id):
 # ---- OPTIONAL: Export all exam results to PDF, for your button 'export_exam_pdf'
 @main.route("/exam/export/pdf")
 def export_exam_pdf():
-    results = ExamResult.query.order_by(ExamResult.programme.asc()).all()
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Paragraph("<b>Exam Results Summary</b>", styles["Title"]))
-    story.append(Spacer(1, 12))
-
-    data = [["Programme", "Gen M", "Gen F", "Gen T",
-             "EWS M", "EWS F", "EWS T",
-             "SC M", "SC F", "SC T",
-             "ST M", "ST F", "ST T",
-             "OBC M", "OBC F", "OBC T"]]
-
-    for r in results:
-        data.append([
-            r.programme,
-            r.general_male, r.general_female, r.general_transgender,
-            r.ews_male, r.ews_female, r.ews_transgender,
-            r.sc_male, r.sc_female, r.sc_transgender,
-            r.st_male, r.st_female, r.st_transgender,
-            r.obc_male, r.obc_female, r.obc_transgender
-        ])
-
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
-    ]))
-
-    story.append(table)
-    doc.build(story)
-
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    response = make_response(pdf)
-    response.headers["Content-Type"] = "application/pdf"
-    response.headers["Content-Disposition"] = "attachment; filename=exam_results.pdf"
-    return response
+    # Group rows by programme id; unmatched legacy rows sort by their own label
+    results = (
+        ExamResult.query.outerjoin(Programme, ExamResult.programme_id == Programme.id)
+        .options(joinedload(ExamResult.prog))
+        .order_by(db.func.coalesce(Programme.programme, ExamResult.programme).asc())
+        .all()
+    )
+    return _pdf_response(render_pdf("exam", results), "exam_results.pdf")
+
+
+# ----------------------------------------------------
+# STUDENT MARKS (mark sheets → SGPA / CGPA → generated exam results)
+# ----------------------------------------------------
+@main.route("/exam/marks", methods=["GET", "POST"])
+def exam_marks():
+    if request.method == "POST":
+        upload = request.files.get("sheet")
+        if not upload or not upload.filename:
+            flash("Choose a CSV mark sheet to upload.", "danger")
+            return redirect(url_for("main.exam_marks"))
+        try:
+            loaded = import_marks(read_sheet(upload.stream))
+        except MarksError as e:
+            more = f" (and {e.total - len(e.errors)} more)" if e.total > len(e.errors) else ""
+            flash(f"Mark sheet rejected, nothing was saved: {'; '.join(e.errors)}{more}", "danger")
+        else:
+            flash(f"{loaded['inserted']} marks added, {loaded['updated']} corrected, "
+                  f"{loaded['unchanged']} unchanged; results recomputed for "
+                  f"{len(loaded['terms'])} term(s).", "success")
+        return redirect(url_for("main.exam_marks"))
+
+    return render_template("exam/marks.html", terms=term_summaries())
+
+
+@main.route("/exam/marks/compute", methods=["POST"])
+def compute_exam_marks():
+    session_year = archive.parse_academic_year(request.form.get("session"))
+    semester = request.form.get("semester", type=int)
+    if session_year is None or not semester:
+        flash("Give a session (e.g. 2024-25) and a semester.", "danger")
+        return redirect(url_for("main.exam_marks"))
+    result = compute_results(session_year, semester, request.form.get("programme_id", type=int))
+    flash(f"{result['session']} semester {result['semester']}: {result['passed']} of "
+          f"{result['students']} students passed ({result['seconds']}s).", "success")
+    return redirect(url_for("main.exam_marks"))
+
+
+# =====================================================
+# JSON API — date-range queries (?from=YYYY-MM-DD&to=YYYY-MM-DD)
+# =====================================================
+@main.route("/api/placements")
+def api_placements():
+    date_from, date_to = date_range_args(request.args)
+    query = filter_date_range(Placement.query, Placement.date, date_from, date_to)
+    rows = archive.archived_rows(Placement, date_from, date_to)
+    rows += query.order_by(Placement.date.asc()).all()
+    return jsonify([
+        {"id": p.id, "company": p.company, "role": p.role,
+         "date": p.date.isoformat() if p.date else None,
+         "archive": getattr(p, "archive", None)}
+        for p in rows
+    ])
+
+
+@main.route("/api/nss")
+def api_nss():
+    date_from, date_to = date_range_args(request.args)
+    query = filter_date_range(NSSEnrollment.query, NSSEnrollment.date, date_from, date_to)
+    rows = archive.archived_rows(NSSEnrollment, date_from, date_to)
+    rows += query.order_by(NSSEnrollment.date.asc()).all()
+    return jsonify([
+        {"id": n.id, "activity": n.activity, "male": n.male, "female": n.female,
+         "total": n.total, "date": n.date.isoformat() if n.date else None,
+         "archive": getattr(n, "archive", None)}
+        for n in rows
+    ])
+
+
+@main.route("/api/students")
+def api_students():
+    # Date of birth range, e.g. eligibility cut-offs; ?limit= (default 1000, max 10000)
+    date_from, date_to = date_range_args(request.args)
+    query = filter_date_range(Student.query, Student.dob, date_from, date_to)
+    limit = max(0, min(request.args.get("limit", 1000, type=int), 10000))
+    return jsonify([
+        {"id": s.id, "roll_no": s.roll_no, "name": s.name,
+         "dob": s.dob.isoformat() if s.dob else None}
+        for s in query.order_by(Student.dob.asc(), Student.id.asc()).limit(limit)
+    ])
+
+
+@main.route("/api/audit")
+def api_audit():
+    # ?from=&to= (dates), ?table=student&row_id=5, ?limit=
+    date_from, date_to = date_range_args(request.args)
+    entries = history(
+        start=date_from,
+        end=date_to + timedelta(days=1) if date_to else None,
+        table=request.args.get("table"),
+        row_id=request.args.get("row_id", type=int),
+        limit=min(request.args.get("limit", 1000, type=int), 10000),
+    )
+    return jsonify([e.to_dict() for e in entries])
+
+
+@main.route("/api/health")
+def api_health():
+    # Database size, free pages, planner statistics and the last maintenance run
+    return jsonify(maintenance.health())
+
+
+@main.route("/api/changes")
+def api_changes():
+    # Incremental sync: every insert/update/delete after ?since=<seq> as
+    # newline-delimited JSON, oldest first. X-Change-Head is the newest seq at
+    # request time; if ?limit= cut the stream short, call again with the last
+    # seq received.
+    since = max(request.args.get("since", 0, type=int), 0)
+    limit = min(request.args.get("limit", 100000, type=int), 100000)
+    head = change_head()
+    return Response(
+        change_feed(db.engine, since, head, limit),
+        mimetype="application/x-ndjson",
+        headers={"X-Change-Head": str(head)},
+    )
+
+
+@main.route("/api/analytics/<dataset>")
+def api_analytics(dataset):
+    # e.g. /api/analytics/enrollment?rows=year&cols=category,gender&percent=row
+    #      /api/analytics/exam?rows=programme,year&cols=category&yoy=delta&format=csv
+    def field_list(arg):
+        return [f.strip() for f in request.args.get(arg, "").split(",") if f.strip()]
+
+    try:
+        table = analytics.pivot(
+            dataset,
+            rows=field_list("rows"),
+            cols=field_list("cols"),
+            percent=request.args.get("percent") or None,
+            yoy=request.args.get("yoy") or None,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if request.args.get("format") == "csv":
+        return Response(
+            analytics.to_csv(table), mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={dataset}_pivot.csv"},
+        )
+    return jsonify(analytics.to_chart(table))
+
+
+@main.route("/api/metrics/<metric>")
+def api_metrics(metric):
+    # e.g. /api/metrics/admissions?granularity=day&from=2025-06-01&to=2025-08-31
+    #      /api/metrics/nss_participation?granularity=year&dimension=Tree Plantation
+    date_from, date_to = date_range_args(request.args)
+    try:
+        data = rollups.series(
+            metric,
+            granularity=request.args.get("granularity", "month"),
+            start=date_from,
+            end=date_to,
+            dimension=request.args.get("dimension"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(data)
@@ -0,0 +1,194 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from . import db
+from .admissions import CATEGORY_ALIASES
+from .models import Scholarship, ScholarshipEligibility, Student
+
+
+# =====================================================
+# SCHOLARSHIP ELIGIBILITY
+# =====================================================
+# Each scholarship carries structured rules (programme, year range,
+# categories, genders, income band); an empty rule matches everyone.
+# scholarship_eligibility holds the current (scholarship, student) matches:
+# a full pass evaluates every rule against one column-wise frame of all
+# active students, and flushes re-evaluate only what changed — the edited
+# students against every rule, or every student against an edited rule.
+STUDENT_FIELDS = ("programme_id", "year", "category", "gender", "annual_income", "graduated_year")
+RULE_FIELDS = ("programme_id", "year_min", "year_max", "categories", "genders", "income_min", "income_max")
+
+Rule = namedtuple("Rule", ("id",) + RULE_FIELDS)
+
+INSERT_SQL = "INSERT INTO scholarship_eligibility (scholarship_id, student_id) VALUES (?, ?)"
+CHUNK = 500   # ids per IN (...) list
+
+
+def parse_amount(value):
+    """'₹ 12,500/-', 'Rs. 5000', '5000.0' → 12500 / 5000; None if there is no number."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.search(r"\d[\d,]*(\.\d+)?", str(value))
+    return int(float(match.group(0).replace(",", ""))) if match else None
+
+
+def split_list(value):
+    """'SC, st' → {'SC', 'ST'}; empty → empty set (= no restriction)."""
+    return {v.strip().upper() for v in (value or "").split(",") if v.strip()}
+
+
+def _upper(column):
+    # Unlike admissions.normalize_category, a missing value stays "" and matches no rule
+    return column.fillna("").astype(str).str.strip().str.upper()
+
+
+# -------------------------
+# Loading
+# -------------------------
+def _chunks(ids):
+    ids = sorted(ids)
+    return [ids[i:i + CHUNK] for i in range(0, len(ids), CHUNK)]
+
+
+def _student_frame(conn, ids=None):
+    """Active students as arrays: id, programme_id, year, category, gender, income."""
+    columns = [Student.id, Student.programme_id, Student.year, Student.category,
+               Student.gender, Student.annual_income]
+    query = select(*columns).where(Student.graduated_year.is_(None))
+    if ids is None:
+        rows = conn.execute(query).all()
+    else:
+        rows = [row for chunk in _chunks(ids) for row in conn.execute(query.where(Student.id.in_(chunk)))]
+
+    frame = pd.DataFrame(rows, columns=["id", "programme_id", "year", "category", "gender", "income"])
+    return {
+        "id": frame["id"].to_numpy(dtype=np.int64),
+        # NaN for missing numbers: every comparison with NaN is False
+        "programme_id": pd.to_numeric(frame["programme_id"], errors="coerce").to_numpy(dtype=float),
+        "year": pd.to_numeric(frame["year"], errors="coerce").to_numpy(dtype=float),
+        "income": pd.to_numeric(frame["income"], errors="coerce").to_numpy(dtype=float),
+        "category": _upper(frame["category"]).replace(CATEGORY_ALIASES).to_numpy(dtype=object),
+        "gender": _upper(frame["gender"]).to_numpy(dtype=object),
+    }
+
+
+def _rules(conn, ids=None):
+    query = select(Scholarship.id, *(getattr(Scholarship, f) for f in RULE_FIELDS))
+    if ids is not None:
+        query = query.where(Scholarship.id.in_(sorted(ids)))
+    return [Rule(*row) for row in conn.execute(query)]
+
+
+# -------------------------
+# Matching
+# -------------------------
+def match(students, rules):
+    """Every (scholarship_id, student_id) pair whose student satisfies the rule."""
+    pairs = []
+    n = len(students["id"])
+    for rule in rules:
+        mask = np.ones(n, dtype=bool)
+        if rule.programme_id is not None:
+            mask &= students["programme_id"] == rule.programme_id
+        if rule.year_min is not None:
+            mask &= students["year"] >= rule.year_min
+        if rule.year_max is not None:
+            mask &= students["year"] <= rule.year_max
+        if rule.income_min is not None:
+            mask &= students["income"] >= rule.income_min
+        if rule.income_max is not None:
+            mask &= students["income"] <= rule.income_max
+        categories = split_list(rule.categories)
+        if categories:
+            mask &= np.isin(students["category"], list(categories))
+        genders = split_list(rule.genders)
+        if genders:
+            mask &= np.isin(students["gender"], list(genders))
+        pairs.extend((rule.id, sid) for sid in students["id"][mask].tolist())
+    return pairs
+
+
+def _insert(conn, pairs):
+    if pairs:
+        conn.exec_driver_sql(INSERT_SQL, pairs)
+
+
+def rebuild(conn):
+    """Full pass: every rule against every active student."""
+    conn.execute(ScholarshipEligibility.__table__.delete())
+    _insert(conn, match(_student_frame(conn), _rules(conn)))
+
+
+def refresh_students(conn, ids):
+    table = ScholarshipEligibility.__table__
+    for chunk in _chunks(ids):
+        conn.execute(table.delete().where(table.c.student_id.in_(chunk)))
+    _insert(conn, match(_student_frame(conn, ids), _rules(conn)))
+
+
+def refresh_scholarships(conn, ids):
+    table = ScholarshipEligibility.__table__
+    conn.execute(table.delete().where(table.c.scholarship_id.in_(sorted(ids))))
+    _insert(conn, match(_student_frame(conn), _rules(conn, ids)))
+
+
+# -------------------------
+# Incremental re-evaluation on flush
+# -------------------------
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[f].history.has_changes() for f in fields)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    students, scholarships = set(), set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Student):
+            students.add(obj.id)
+        elif isinstance(obj, Scholarship):
+            scholarships.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Student) and _changed(obj, STUDENT_FIELDS):
+            students.add(obj.id)
+        elif isinstance(obj, Scholarship) and _changed(obj, RULE_FIELDS):
+            scholarships.add(obj.id)
+
+    if students or scholarships:
+        conn = session.connection()
+        if scholarships:
+            refresh_scholarships(conn, scholarships)
+        if students:
+            refresh_students(conn, students)
+
+
+# -------------------------
+# Querying
+# -------------------------
+def summary():
+    """{scholarship_id: (eligible students, total outlay)} for every scholarship."""
+    counts = dict(
+        db.session.query(ScholarshipEligibility.scholarship_id, db.func.count())
+        .group_by(ScholarshipEligibility.scholarship_id)
+    )
+    return {
+        sid: (counts.get(sid, 0), counts.get(sid, 0) * (amount or 0))
+        for sid, amount in db.session.query(Scholarship.id, Scholarship.amount)
+    }
+
+
+def eligible_students(scholarship_id, limit=None):
+    query = (
+        db.session.query(Student)
+        .join(ScholarshipEligibility, ScholarshipEligibility.student_id == Student.id)
+        .filter(ScholarshipEligibility.scholarship_id == scholarship_id)
+        .order_by(Student.roll_no)
+    )
+    return query.limit(limit).all() if limit else query.all()
@@ -0,0 +1,5 @@
+from app import create_app
+from app.asgi import AsyncExportApp
+
+# ASGI entry point:  uvicorn asgi:app --workers 2
+app = AsyncExportApp(create_app())